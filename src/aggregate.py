@@ -0,0 +1,367 @@
+import numpy as np
+from alleles import AllelePopulation, append_mutations, code_dtype, compact_alleles
+from fitness import batch_fitness
+from mutation import MUTATION_RATE, MUTATION_SCALE, draw_mutations
+from organism import TRAITS
+from patch_index import PatchIndex
+from reproduction import allocate_offspring_by_patch, expected_offspring
+from rng import get_rng
+from selection import CumulativeSampler
+
+# Simulation engines: one column per organism, one per genotype class, or
+# switching between the two as genotype diversity changes
+ENGINES = ('individual', 'aggregate', 'hybrid')
+
+# The hybrid engine expands classes back into organisms only once there are
+# this many times more classes than the threshold for grouping them
+EXPAND_FACTOR = 2
+
+# Classes with at most this many parents draw every brood exactly; larger
+# classes draw their brood total from a normal approximation
+EXACT_BROOD_LIMIT = 64
+
+# Gauss-Hermite rule for the moments of a brood size over its Gaussian factor
+_NODES, _WEIGHTS = np.polynomial.hermite_e.hermegauss(64)
+_WEIGHTS = _WEIGHTS / _WEIGHTS.sum()
+
+
+class GenotypeCounts:
+    def __init__(self, codes, alleles, count, patch, fitness=None, trait_names=TRAITS):
+        """
+        Population stored as classes of identical organisms.
+
+        Class ``k`` stands for ``count[k]`` organisms sharing the genotype
+        ``codes[:, k]`` (codes into the per-trait allele tables ``alleles``,
+        as in ``AllelePopulation``) and the patch ``patch[k]``; ``fitness[k]``
+        is their common fitness. Memory and time per generation scale with the
+        number of classes, not the census size.
+
+        :param codes: Integer array of shape (num_traits, num_classes).
+        :param alleles: One 1-D array of allele values per trait.
+        :param count: Number of organisms per class.
+        :param patch: Patch index per class.
+        :param fitness: Fitness per class (optional, defaults to 0).
+        :param trait_names: Names of the trait rows, in order.
+        """
+        self.trait_names = tuple(trait_names)
+        self.alleles = [np.asarray(table, dtype=np.float64) for table in alleles]
+        dtype = code_dtype(max((len(table) for table in self.alleles), default=0))
+        self.codes = np.ascontiguousarray(codes, dtype=dtype).reshape(len(self.trait_names), -1)
+        self.count = np.asarray(count, dtype=np.int64)
+        self.patch = np.asarray(patch, dtype=np.intp)
+        self.fitness = np.zeros(self.num_classes) if fitness is None else np.asarray(fitness, dtype=np.float64)
+
+    @classmethod
+    def from_columns(cls, codes, alleles, count, patch, fitness=None, trait_names=TRAITS):
+        """
+        Build classes from columns that may repeat a (genotype, patch) pair.
+
+        Columns with the same genotype and patch are merged and empty columns
+        dropped; a merged class keeps the fitness of its first column.
+        """
+        codes = np.asarray(codes).reshape(len(trait_names), -1)
+        count = np.asarray(count, dtype=np.int64)
+        keep = count > 0
+        keys = np.vstack((codes[:, keep].astype(np.int64), np.asarray(patch, dtype=np.int64)[keep]))
+        if not keys.shape[1]:
+            return cls(codes[:, keep], alleles, count[keep], keys[-1], trait_names=trait_names)
+
+        # Pack every (genotype, patch) key into one integer when it fits; sorting
+        # scalars is much faster than sorting columns
+        dims = [len(table) for table in alleles] + [int(keys[-1].max()) + 2]
+        if np.prod(np.array(dims, dtype=np.float64)) < 2 ** 62:
+            keys[-1] += 1
+            _, first, inverse = np.unique(np.ravel_multi_index(keys, dims), return_index=True, return_inverse=True)
+            unique = keys[:, first]
+            unique[-1] -= 1
+        else:
+            unique, first, inverse = np.unique(keys, axis=1, return_index=True, return_inverse=True)
+        merged = np.bincount(inverse.reshape(-1), weights=count[keep], minlength=unique.shape[1])
+        merged_fitness = None if fitness is None else np.asarray(fitness, dtype=np.float64)[keep][first]
+        return cls(unique[:-1], alleles, merged.astype(np.int64), unique[-1], fitness=merged_fitness, trait_names=trait_names)
+
+    @classmethod
+    def from_population(cls, population):
+        """
+        Group the organisms of a Population or AllelePopulation into classes.
+
+        Lossless: ``to_population`` gives back the same organisms, grouped by class.
+        """
+        if not isinstance(population, AllelePopulation):
+            population = AllelePopulation.from_population(population)
+        return cls.from_columns(
+            population.codes, population.alleles, np.ones(len(population), dtype=np.int64), population.patch,
+            fitness=population.fitness, trait_names=population.trait_names,
+        )
+
+    def to_population(self):
+        """
+        Expand into an AllelePopulation with one column per organism.
+        """
+        index = np.repeat(np.arange(self.num_classes), self.count)
+        return AllelePopulation(
+            self.codes[:, index], list(self.alleles),
+            fitness=self.fitness[index], patch=self.patch[index], trait_names=self.trait_names,
+        )
+
+    @property
+    def num_classes(self):
+        return self.codes.shape[1]
+
+    @property
+    def traits(self):
+        """
+        Decoded genotype of every class, shape (num_traits, num_classes).
+        """
+        return np.stack([table[codes] for table, codes in zip(self.alleles, self.codes)]).reshape(self.codes.shape)
+
+    def __len__(self):
+        return int(self.count.sum())
+
+    def num_genotypes(self):
+        """
+        Return the number of distinct genotypes, ignoring patches.
+        """
+        return np.unique(self.codes, axis=1).shape[1] if self.num_classes else 0
+
+    def with_counts(self, count):
+        """
+        Return the same classes with new counts, dropping the empty ones.
+        """
+        keep = np.asarray(count) > 0
+        return GenotypeCounts(
+            self.codes[:, keep], list(self.alleles), np.asarray(count)[keep], self.patch[keep],
+            fitness=self.fitness[keep], trait_names=self.trait_names,
+        )
+
+    def compact(self):
+        """
+        Drop unused alleles from the tables and renumber the codes, in place.
+        """
+        self.codes, self.alleles = compact_alleles(self.codes, self.alleles)
+
+    def move_to_patches(self, environment):
+        """
+        Move every organism for one generation, see ``Environment.disperse_counts``.
+        """
+        group, patch, count = environment.disperse_counts(self.patch, self.count)
+        self._assign(GenotypeCounts.from_columns(
+            self.codes[:, group], self.alleles, count, patch, trait_names=self.trait_names
+        ))
+
+    def calculate_fitness(self, environment):
+        """
+        Calculate fitness of every class against the optimal traits of its patch.
+        """
+        self.fitness = batch_fitness(self.traits, self.patch, environment.optimal_matrix(self.trait_names))
+
+    def mutate(self, mutation_rate=MUTATION_RATE, rng=None):
+        """
+        Apply Gaussian mutations to each trait value with probability ``mutation_rate``.
+
+        Draws the same events as ``Population.mutate`` over the organisms of
+        all classes (taken class by class). Every mutated organism leaves its
+        class and becomes a class of its own, with new alleles appended.
+
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: Number of mutation events.
+        """
+        size = len(self)
+        slots, effects = draw_mutations(len(self.trait_names) * size, mutation_rate, MUTATION_SCALE, rng)
+        if not len(slots):
+            return 0
+
+        trait_index, organism = np.divmod(slots, size)
+        mutants, mutant_index = np.unique(organism, return_inverse=True)
+        mutant_class = np.searchsorted(np.cumsum(self.count), mutants, side='right')
+        codes, alleles = append_mutations(
+            self.codes[:, mutant_class], self.alleles, trait_index, mutant_index.reshape(-1), effects
+        )
+        count = self.count - np.bincount(mutant_class, minlength=self.num_classes)
+        self._assign(GenotypeCounts.from_columns(
+            np.concatenate((self.codes.astype(codes.dtype), codes), axis=1),
+            alleles,
+            np.concatenate((count, np.ones(len(mutants), dtype=np.int64))),
+            np.concatenate((self.patch, self.patch[mutant_class])),
+            trait_names=self.trait_names,
+        ))
+        return len(slots)
+
+    def trait_means(self):
+        """
+        Return the mean of every trait (0 for an empty population).
+        """
+        size = len(self)
+        if not size:
+            return {trait: 0 for trait in self.trait_names}
+        return {
+            trait: float(self.count @ table[codes] / size)
+            for trait, table, codes in zip(self.trait_names, self.alleles, self.codes)
+        }
+
+    def mean_fitness(self):
+        """
+        Return the mean fitness (0 for an empty population).
+        """
+        size = len(self)
+        return float(self.count @ self.fitness / size) if size else 0.0
+
+    def patch_sizes(self, num_patches):
+        """
+        Return the number of organisms in every patch.
+        """
+        return np.bincount(self.patch, weights=self.count, minlength=num_patches).astype(np.int64)
+
+    def _assign(self, other):
+        self.codes, self.alleles = other.codes, other.alleles
+        self.count, self.patch, self.fitness = other.count, other.patch, other.fitness
+
+
+def adapt_representation(population, threshold, genetics='dense'):
+    """
+    Pick the cheaper population layout for the hybrid engine.
+
+    Organisms are grouped into a GenotypeCounts once there are fewer than
+    ``threshold * size`` distinct (genotype, patch) classes, and classes are
+    expanded back into organisms once there are more than ``EXPAND_FACTOR``
+    times as many, so a population near the threshold does not switch every
+    generation. Both conversions are lossless.
+
+    :param population: Population, AllelePopulation or GenotypeCounts.
+    :param threshold: Classes per organism below which grouping pays off.
+    :param genetics: Trait representation of expanded populations ('dense' or 'alleles').
+    :return: The population in the chosen layout (possibly the same object).
+    """
+    size = len(population)
+    if isinstance(population, GenotypeCounts):
+        if population.num_classes <= EXPAND_FACTOR * threshold * size:
+            return population
+        expanded = population.to_population()
+        return expanded.to_population() if genetics == 'dense' else expanded
+
+    counts = GenotypeCounts.from_population(population)
+    return counts if counts.num_classes < threshold * size else population
+
+
+def brood_totals(fitness, count, egg_count, egg_survival_rate, rng=None):
+    """
+    Draw the total brood of every class of identical parents.
+
+    Small classes draw each parent's brood with ``expected_offspring``. For
+    classes above ``EXACT_BROOD_LIMIT`` the total is drawn from a normal
+    distribution with the exact per-parent mean and variance, integrated over
+    the Gaussian factor of ``expected_offspring`` by quadrature.
+
+    :param fitness: Fitness per class.
+    :param count: Number of parents per class.
+    :param egg_count: Eggs per reproduction event.
+    :param egg_survival_rate: Egg survival rate per class.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Integer array with the number of offspring per class.
+    """
+    rng = get_rng(rng)
+    fitness = np.asarray(fitness, dtype=np.float64)
+    count = np.asarray(count, dtype=np.int64)
+    egg_survival_rate = np.broadcast_to(egg_survival_rate, fitness.shape)
+    totals = np.empty(len(count), dtype=np.int64)
+
+    small = count <= EXACT_BROOD_LIMIT
+    parent = np.repeat(np.arange(int(small.sum())), count[small])
+    broods = expected_offspring(fitness[small][parent], egg_count, egg_survival_rate[small][parent], rng=rng)
+    totals[small] = np.bincount(parent, weights=broods, minlength=int(small.sum()))
+
+    large = ~small
+    if large.any():
+        scale = fitness[large] * egg_count * egg_survival_rate[large]
+        factor = (0.5 + fitness[large])[:, None] + 0.2 * _NODES
+        brood = np.maximum(1, np.trunc(scale[:, None] * factor))
+        mean = brood @ _WEIGHTS
+        variance = np.maximum(brood * brood @ _WEIGHTS - mean * mean, 0)
+        parents = count[large]
+        totals[large] = np.maximum(parents, np.rint(rng.normal(parents * mean, np.sqrt(parents * variance))))
+    return totals
+
+
+def aggregate_generation(population, environment, params, rng):
+    """
+    Run one generation on genotype classes.
+
+    Follows the individual engine step by step with the per-organism draws
+    replaced by draws on counts: viability is a binomial thinning, broods are
+    summed per class, the carrying capacity of every crowded patch is one
+    hypergeometric draw over its classes, mates are multinomial within each patch and the inheritance of
+    every parent pair is multinomial over the 2**num_traits crossover masks.
+
+    :param population: GenotypeCounts at the start of the generation (moved in place).
+    :param environment: The Environment, already updated for this generation.
+    :param params: Simulation parameters (see ``simulate``).
+    :param rng: numpy.random.Generator to draw from.
+    :return: Tuple (offspring, viable_size, egg_survival_rate), or None when
+             no organism is viable.
+    """
+    egg_count = params['egg_count']
+    population.move_to_patches(environment)
+    population.calculate_fitness(environment)
+
+    # Organisms pass a threshold jittered uniformly by +-0.1
+    survival = np.clip((population.fitness - params['fitness_threshold'] + 0.1) / 0.2, 0, 1)
+    viable = population.with_counts(rng.binomial(population.count, survival))
+    if not viable.num_classes:
+        return None
+
+    patch_survival_rate = (1+environment.food)**2/(egg_count)
+    egg_survival_rate = patch_survival_rate[viable.patch]
+    patch_index = PatchIndex(viable.patch, environment.num_patches)
+    broods = allocate_offspring_by_patch(
+        brood_totals(viable.fitness, viable.count, egg_count, egg_survival_rate, rng=rng),
+        patch_index, environment.patch_capacity(params['carrying_capacity']), rng=rng,
+    )
+
+    # Fitness-weighted mates from the focal class's patch (by count if all weights are zero).
+    # Broods smaller than the patch's class count draw their mates one by one,
+    # larger ones draw mate counts over all classes of their patch at once
+    weights = viable.fitness * viable.count
+    patch_weight = np.bincount(viable.patch, weights=weights, minlength=environment.num_patches)
+    weights = np.where(patch_weight[viable.patch] > 0, weights, viable.count.astype(np.float64))
+    patch_weight = np.bincount(viable.patch, weights=weights, minlength=environment.num_patches)
+    order = patch_index.order
+    few = broods < patch_index.sizes[viable.patch]
+
+    single = np.repeat(np.flatnonzero(few), broods[few])
+    sampler = CumulativeSampler(weights[order], offsets=patch_index.offsets)
+    single_mate = order[sampler.sample(len(single), rng=rng, segment=viable.patch[single])]
+
+    # One multinomial over a (class, patch member) matrix; members are aligned
+    # to the right so that the padding never takes the rounding remainder
+    large = np.flatnonzero(~few)
+    large_patch = viable.patch[large]
+    width = int(patch_index.sizes[large_patch].max()) if len(large) else 0
+    column = np.arange(width) - (width - patch_index.sizes[large_patch])[:, None]
+    padded = column < 0
+    member = order[np.where(padded, 0, patch_index.offsets[large_patch][:, None] + column)]
+    pvals = np.where(padded, 0.0, weights[member] / patch_weight[large_patch][:, None])
+    pairs = rng.multinomial(broods[large], pvals) if len(large) else np.zeros((0, 0), dtype=np.int64)
+    large_position, member_position = np.nonzero(pairs)
+
+    focal = np.concatenate((single, large[large_position]))
+    mate = np.concatenate((single_mate, member[large_position, member_position]))
+    pair_count = np.concatenate((np.ones(len(single), dtype=np.int64), pairs[large_position, member_position]))
+
+    # Bit j of a crossover mask set means trait j comes from the mate
+    num_traits = len(viable.trait_names)
+    inheritance = rng.multinomial(pair_count, np.full(2 ** num_traits, 0.5 ** num_traits))
+    pair, mask = np.nonzero(inheritance)
+    from_mate = (mask >> np.arange(num_traits)[:, None]) & 1 == 1
+    codes = np.where(from_mate, viable.codes[:, mate[pair]], viable.codes[:, focal[pair]])
+
+    offspring = GenotypeCounts.from_columns(
+        codes, viable.alleles, inheritance[pair, mask], viable.patch[focal[pair]], trait_names=viable.trait_names
+    )
+    if any(len(table) > 2 * offspring.num_classes for table in offspring.alleles):
+        offspring.compact()
+    offspring.mutate(params['mutation_rate'], rng=rng)
+    offspring.move_to_patches(environment)
+    offspring.calculate_fitness(environment)
+
+    egg_survival_rate = float(viable.count @ egg_survival_rate / len(viable))
+    return offspring, len(viable), egg_survival_rate
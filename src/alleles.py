@@ -0,0 +1,258 @@
+import numpy as np
+from mutation import MUTATION_RATE, MUTATION_SCALE, draw_mutations
+from organism import TRAITS
+from population import Population
+from reproduction import crossover
+
+
+def code_dtype(num_alleles):
+    """
+    Return the smallest unsigned integer type able to index ``num_alleles`` alleles.
+    """
+    return np.uint16 if num_alleles <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+class AllelePopulation:
+    def __init__(self, codes, alleles, fitness=None, patch=None, trait_names=TRAITS):
+        """
+        Population whose trait values are stored as codes into allele tables.
+
+        Offspring only copy parental trait values, so a population holds few
+        distinct values per trait. ``alleles[j]`` lists the distinct values of
+        trait ``j`` and ``codes[j, i]`` is the position of organism ``i``'s
+        value in it, stored as uint16 (or uint32 once a table outgrows 65536
+        entries). Tables are append-only: mutation adds a new allele instead
+        of editing one, and populations derived by ``take`` or ``reproduce``
+        share the tables of their parents.
+
+        Offers the interface the simulation engine uses of ``Population``;
+        ``traits`` decodes the full trait matrix on access.
+
+        :param codes: Integer array of shape (num_traits, size).
+        :param alleles: One 1-D array of allele values per trait.
+        :param fitness: Fitness per organism (optional, defaults to 0).
+        :param patch: Patch index per organism (optional, defaults to -1).
+        :param trait_names: Names of the trait rows, in order.
+        """
+        self.trait_names = tuple(trait_names)
+        self.alleles = [np.asarray(table, dtype=np.float64) for table in alleles]
+        if len(self.alleles) != len(self.trait_names):
+            raise ValueError("There must be one allele table per trait.")
+        dtype = code_dtype(max((len(table) for table in self.alleles), default=0))
+        self.codes = np.ascontiguousarray(codes, dtype=dtype).reshape(len(self.trait_names), -1)
+        size = self.codes.shape[1]
+        self.fitness = np.zeros(size) if fitness is None else np.asarray(fitness, dtype=np.float64)
+        self.patch = np.full(size, -1, dtype=np.intp) if patch is None else np.asarray(patch, dtype=np.intp)
+
+    @classmethod
+    def from_population(cls, population):
+        """
+        Encode a Population; every distinct trait value becomes one allele.
+        """
+        codes = np.empty(population.traits.shape, dtype=np.intp)
+        alleles = []
+        for j, values in enumerate(population.traits):
+            table, codes[j] = np.unique(values, return_inverse=True)
+            alleles.append(table)
+        return cls(codes, alleles, fitness=population.fitness.copy(), patch=population.patch.copy(),
+                   trait_names=population.trait_names)
+
+    def to_population(self):
+        """
+        Decode into a Population holding the same trait values.
+        """
+        return Population(self.traits, fitness=self.fitness.copy(), patch=self.patch.copy(), trait_names=self.trait_names)
+
+    @property
+    def traits(self):
+        return np.stack([table[codes] for table, codes in zip(self.alleles, self.codes)]).reshape(self.codes.shape)
+
+    def __len__(self):
+        return self.codes.shape[1]
+
+    def trait(self, name):
+        """
+        Return the decoded values of the given trait.
+        """
+        j = self.trait_names.index(name)
+        return self.alleles[j][self.codes[j]]
+
+    def num_alleles(self):
+        """
+        Return the number of alleles in use for every trait.
+        """
+        return [int(np.count_nonzero(np.bincount(codes, minlength=len(table))))
+                for table, codes in zip(self.alleles, self.codes)]
+
+    def take(self, index):
+        """
+        Return a new AllelePopulation made of the organisms at ``index``.
+
+        :param index: Integer index array (may repeat entries) or boolean mask.
+        """
+        return AllelePopulation(
+            self.codes[:, index],
+            list(self.alleles),
+            fitness=self.fitness[index],
+            patch=self.patch[index],
+            trait_names=self.trait_names,
+        )
+
+    def reproduce(self, parent_a, parent_b, rng=None):
+        """
+        Create the offspring of many parent pairs in one batch.
+
+        Crossover gathers codes instead of values. When the allele tables have
+        grown much larger than the brood, unused alleles are dropped.
+
+        :param parent_a: Index of the first parent of each offspring.
+        :param parent_b: Index of the second parent of each offspring.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: A new AllelePopulation holding the offspring.
+        """
+        offspring = AllelePopulation(
+            crossover(self.codes, parent_a, parent_b, rng), list(self.alleles), trait_names=self.trait_names
+        )
+        if any(len(table) > 2 * len(offspring) for table in offspring.alleles):
+            offspring.compact()
+        return offspring
+
+    def compact(self):
+        """
+        Drop unused alleles from the tables and renumber the codes, in place.
+        """
+        self.codes, self.alleles = compact_alleles(self.codes, self.alleles)
+
+    def move_to_patches(self, environment):
+        """
+        Move every organism for one generation, see ``Environment.disperse``.
+        """
+        self.patch = environment.disperse(self.patch)
+
+    def calculate_fitness(self, environment):
+        """
+        Calculate fitness of every organism against the optimal traits of its patch.
+
+        For a trait with few alleles, ``1 - |allele - optimal|`` is computed
+        once per (allele, patch) pair and gathered by code and patch; traits
+        with more alleles than that table is worth fall back to decoding.
+        Terms are summed in the same order as ``batch_fitness``, so results
+        match the dense representation exactly.
+        """
+        optimal = environment.optimal_matrix(self.trait_names)
+        total = np.zeros(len(self))
+        for j, table in enumerate(self.alleles):
+            if len(table) * optimal.shape[1] <= len(self):
+                total += (1 - np.abs(table[:, None] - optimal[j]))[self.codes[j], self.patch]
+            else:
+                total += 1 - np.abs(table[self.codes[j]] - optimal[j, self.patch])
+        self.fitness = np.divide(total, len(self.trait_names))
+
+    def mutate(self, mutation_rate=MUTATION_RATE, rng=None):
+        """
+        Apply Gaussian mutations to each trait value with probability ``mutation_rate``.
+
+        Draws the same events as ``Population.mutate``; every event appends
+        the mutated value as a new allele and points the organism's code at it.
+
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: Tuple (trait_index, organism_index) of the mutated slots.
+        """
+        slots, effects = draw_mutations(self.codes.size, mutation_rate, MUTATION_SCALE, rng)
+        if not len(slots):
+            return np.unravel_index(slots, self.codes.shape)
+
+        trait_index, organism_index = np.unravel_index(slots, self.codes.shape)
+        self.codes, self.alleles = append_mutations(self.codes, self.alleles, trait_index, organism_index, effects)
+        return trait_index, organism_index
+
+    def trait_means(self):
+        """
+        Return the mean of every trait (0 for an empty population).
+
+        Each trait is decoded and averaged like a row of the dense trait
+        matrix, so the means match ``Population.trait_means`` exactly.
+        """
+        if not len(self):
+            return {trait: 0 for trait in self.trait_names}
+        return {
+            trait: float(table[codes].mean())
+            for trait, table, codes in zip(self.trait_names, self.alleles, self.codes)
+        }
+
+    def mean_fitness(self):
+        """
+        Return the mean fitness (0 for an empty population).
+        """
+        return float(self.fitness.mean()) if len(self) else 0.0
+
+    def patch_sizes(self, num_patches):
+        """
+        Return the number of organisms in every patch.
+        """
+        return np.bincount(self.patch, minlength=num_patches)
+
+
+def append_mutations(codes, alleles, trait_index, column_index, effects):
+    """
+    Apply mutation events to coded traits by appending new alleles.
+
+    Every event adds ``effect`` to the current value of its slot, stores the
+    result as a new allele and points the slot at it. Events are applied in
+    order, so a slot hit twice builds on its first mutation. Neither input is
+    modified.
+
+    :param codes: Code matrix of shape (num_traits, size).
+    :param alleles: One allele table per trait.
+    :param trait_index: Trait of every event.
+    :param column_index: Column of every event.
+    :param effects: Effect of every event.
+    :return: Tuple (codes, alleles) with the new code matrix and tables.
+    """
+    new_alleles = [[] for _ in alleles]
+    codes = codes.astype(code_dtype(max(len(table) for table in alleles) + len(effects)))
+    # Events are rare, so a plain loop is cheaper than grouping them
+    for j, i, effect in zip(trait_index, column_index, effects):
+        code = codes[j, i]
+        table_size = len(alleles[j])
+        value = alleles[j][code] if code < table_size else new_alleles[j][code - table_size]
+        codes[j, i] = table_size + len(new_alleles[j])
+        new_alleles[j].append(value + effect)
+    alleles = [np.concatenate((table, added)) if added else table for table, added in zip(alleles, new_alleles)]
+    return codes, alleles
+
+
+def compact_alleles(codes, alleles):
+    """
+    Drop unused alleles from the tables and renumber the codes.
+
+    :param codes: Code matrix of shape (num_traits, size).
+    :param alleles: One allele table per trait.
+    :return: Tuple (codes, alleles) with the new code matrix and tables.
+    """
+    compacted_codes = np.empty(codes.shape, dtype=np.intp)
+    compacted = []
+    for j, table in enumerate(alleles):
+        used = np.bincount(codes[j], minlength=len(table)) > 0
+        compacted_codes[j] = (np.cumsum(used) - 1)[codes[j]]
+        compacted.append(table[used])
+    dtype = code_dtype(max((len(table) for table in compacted), default=0))
+    return np.ascontiguousarray(compacted_codes, dtype=dtype), compacted
+
+
+# Trait representations the engines can run with
+GENETICS = ('dense', 'alleles')
+
+
+def encode_population(population, genetics):
+    """
+    Convert a Population into the given trait representation.
+
+    :param population: A Population.
+    :param genetics: 'dense' (returned unchanged) or 'alleles'.
+    """
+    if genetics == 'dense':
+        return population
+    if genetics == 'alleles':
+        return AllelePopulation.from_population(population)
+    raise ValueError(f"Unknown genetics representation: {genetics}")
@@ -0,0 +1,140 @@
+import numpy as np
+from alleles import encode_population
+from config import simulation_params
+from environment import Environment
+from evolution import LogisticLookup, update_optimal_traits_batch
+from generation import breed, select_viable
+from history import EnsembleResult, History
+from population import Population
+from rng import make_rng
+from topology import CaveNetwork
+
+
+def simulate_batched(
+    num_replicates,
+    num_decades,
+    initial_population_size,
+    preset_name,
+    num_patches=1,
+    fitness_threshold=0.5,
+    egg_count=50,
+    carrying_capacity=1000,
+    **params
+):
+    """
+    Run independent replicates of the simulation together in one process.
+
+    All replicates share one flat set of population columns and one
+    environment: replicate ``r`` owns patches ``r * num_patches`` to
+    ``(r + 1) * num_patches - 1``. Because mating, survival and dispersal
+    are local to a patch, every generation runs the same kernel as a single
+    run (see ``generation.breed``), once for all replicates. The carrying
+    capacity applies to each replicate separately. Replicates that go extinct
+    are masked out and their patches are compacted away.
+
+    :param num_replicates: Number of replicates per preset.
+    :param preset_name: Cave preset name, or a list of preset names; every
+                        preset is then run ``num_replicates`` times (replicates
+                        are ordered preset by preset).
+    :param seed: Seed of the shared random number generator (optional).
+    Other parameters are as for ``run_simulation`` and apply to every replicate;
+    only the individual engine is supported.
+    :return: An EnsembleResult with one row per replicate.
+    """
+    params = simulation_params(
+        num_decades=num_decades,
+        initial_population_size=initial_population_size,
+        num_patches=num_patches,
+        fitness_threshold=fitness_threshold,
+        egg_count=egg_count,
+        carrying_capacity=carrying_capacity,
+        **params
+    )
+    if params['engine'] != 'individual':
+        raise ValueError("The batched replicate engine only supports the individual engine.")
+    topology = params['topology']
+    dispersal_rate = params['dispersal_rate']
+
+    preset_names = [preset_name] if isinstance(preset_name, str) else list(preset_name)
+    labels = [name for name in preset_names for _ in range(num_replicates)]
+    total = len(labels)
+    num_generations = num_decades * 10  # 10 generations per decade
+    rng = make_rng(params['seed'])
+    light_lookup = LogisticLookup(params['light_levels']) if params['light_levels'] else None
+    network = CaveNetwork.build(topology, num_patches, dispersal_rate) if topology else None
+
+    blocks = [Environment(num_patches=num_patches, preset=Environment.cave_presets(name), rng=rng) for name in labels]
+    environment = _concatenate(blocks, num_patches, rng, network.tile(total) if network else None)
+
+    population = encode_population(Population.random(initial_population_size * total, rng=rng), params['genetics'])
+    founder_replicate = np.repeat(np.arange(total), initial_population_size)
+    population.patch = founder_replicate * num_patches + rng.integers(num_patches, size=len(population))
+
+    histories = [History(population.trait_names) for _ in range(total)]
+    # Replicate id of every block of patches still in the environment
+    active = np.arange(total)
+
+    for _ in range(num_generations):
+        environment.change_conditions()
+        update_optimal_traits_batch(environment, lookup=light_lookup)
+
+        viable_population = select_viable(population, environment, params['fitness_threshold'], rng)
+
+        # Replicates without viable organisms go extinct; compact their patches away
+        alive = np.bincount(viable_population.patch // num_patches, minlength=len(active)) > 0
+        if not alive.all():
+            environment, viable_population.patch = _compact(environment, viable_population.patch, alive, num_patches, network, rng)
+            active = active[alive]
+        if not len(active):
+            break
+
+        population, _ = breed(viable_population, environment, params, rng)
+        _record(histories, active, population, num_patches)
+
+    return EnsembleResult(histories, num_generations, None, labels=labels)
+
+
+def _concatenate(environments, num_patches, rng, network):
+    return Environment.from_arrays(
+        np.concatenate([environment.light for environment in environments]),
+        np.concatenate([environment.food for environment in environments]),
+        np.concatenate([environment.temperature for environment in environments]),
+        np.concatenate([environment.optimal for environment in environments], axis=1),
+        extra=[extra for environment in environments for extra in environment.extra],
+        rng=rng,
+        network=network,
+        block_size=num_patches,
+    )
+
+
+def _compact(environment, patch, alive, num_patches, network, rng):
+    keep = np.repeat(alive, num_patches)
+    compacted = Environment.from_arrays(
+        environment.light[keep],
+        environment.food[keep],
+        environment.temperature[keep],
+        environment.optimal[:, keep],
+        extra=[extra for extra, kept in zip(environment.extra, keep) if kept],
+        rng=rng,
+        network=network.tile(int(alive.sum())) if network else None,
+        block_size=num_patches,
+    )
+    new_block = np.cumsum(alive) - 1
+    return compacted, new_block[patch // num_patches] * num_patches + patch % num_patches
+
+
+def _record(histories, active, population, num_patches):
+    replicate = population.patch // num_patches
+    sizes = np.bincount(replicate, minlength=len(active))
+    counts = np.maximum(sizes, 1)
+    average_fitness = np.bincount(replicate, weights=population.fitness, minlength=len(active)) / counts
+    trait_means = {
+        trait: np.bincount(replicate, weights=population.trait(trait), minlength=len(active)) / counts
+        for trait in population.trait_names
+    }
+    for position, r in enumerate(active):
+        histories[r].append(
+            sizes[position],
+            average_fitness[position],
+            {trait: means[position] for trait, means in trait_means.items()},
+        )
@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy as np
+from aggregate import GenotypeCounts
+from alleles import AllelePopulation
+from environment import Environment
+from history import History
+from population import Population
+from rng import rng_from_state, rng_state
+from state import SimulationState
+from topology import CaveNetwork
+
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(path, state):
+    """
+    Write the full simulation state to a compact binary file.
+
+    Arrays go into an uncompressed ``.npz`` container and scalar metadata
+    (parameters, generator state, extra patch keys) into an embedded JSON
+    string, so loading never needs pickle. The file is written next to
+    ``path`` and moved into place with ``os.replace``, so an interrupted write
+    never leaves a truncated checkpoint behind.
+
+    :param path: Destination file.
+    :param state: The SimulationState to save.
+    """
+    population = state.population
+    environment = state.environment
+    population_sizes, average_fitness, trait_averages = state.history.as_arrays()
+    network = environment.network
+    network_arrays = {} if network is None else {
+        'network_indptr': network.indptr,
+        'network_indices': network.indices,
+        'network_probability': network.probability,
+    }
+    if isinstance(population, (AllelePopulation, GenotypeCounts)):
+        population_arrays = {'codes': population.codes}
+        if isinstance(population, GenotypeCounts):
+            population_arrays['count'] = population.count
+        population_arrays.update({f'alleles_{j}': table for j, table in enumerate(population.alleles)})
+    else:
+        population_arrays = {'traits': population.traits}
+    metadata = {
+        'version': CHECKPOINT_VERSION,
+        'params': state.params,
+        'generation': state.generation,
+        'extinct': state.extinct,
+        'trait_names': list(population.trait_names),
+        'extra': environment.extra,
+        'rng': rng_state(state.rng),
+    }
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as handle:
+        np.savez(
+            handle,
+            metadata=np.array(json.dumps(metadata)),
+            **population_arrays,
+            fitness=population.fitness,
+            patch=population.patch,
+            light=environment.light,
+            food=environment.food,
+            temperature=environment.temperature,
+            optimal=environment.optimal,
+            population_sizes=population_sizes,
+            average_fitness=average_fitness,
+            trait_averages=trait_averages,
+            **network_arrays,
+        )
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint, including the exact state of the run's generator.
+
+    :param path: File written by ``save_checkpoint``.
+    :return: The saved SimulationState.
+    """
+    with np.load(path) as data:
+        metadata = json.loads(str(data['metadata']))
+        if metadata['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {metadata['version']}")
+
+        trait_names = tuple(metadata['trait_names'])
+        rng = rng_from_state(metadata['rng'])
+        network = None
+        if 'network_indptr' in data:
+            network = CaveNetwork(data['network_indptr'], data['network_indices'], data['network_probability'])
+        if 'codes' in data:
+            alleles = [data[f'alleles_{j}'] for j in range(len(trait_names))]
+            if 'count' in data:
+                population = GenotypeCounts(
+                    data['codes'], alleles, data['count'], data['patch'], fitness=data['fitness'], trait_names=trait_names
+                )
+            else:
+                population = AllelePopulation(data['codes'], alleles, fitness=data['fitness'], patch=data['patch'], trait_names=trait_names)
+        else:
+            population = Population(data['traits'], fitness=data['fitness'], patch=data['patch'], trait_names=trait_names)
+        environment = Environment.from_arrays(
+            data['light'], data['food'], data['temperature'], data['optimal'], extra=metadata['extra'], rng=rng, network=network
+        )
+        history = History.from_arrays(
+            data['population_sizes'], data['average_fitness'], data['trait_averages'], trait_names
+        )
+
+    return SimulationState(
+        metadata['params'], environment, population, history, rng,
+        generation=metadata['generation'], extinct=metadata['extinct'],
+    )
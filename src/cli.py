@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+
+from config import SCHEMA, load_config, validate_config
+from progress import GENERATION, QUIET, SUMMARY, ProgressLogger
+import reporting
+from simulation import simulate
+
+VERBOSITY = {
+    'quiet': QUIET,
+    'summary': SUMMARY,
+    'generation': GENERATION,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run cave evolution simulations non-interactively.",
+    )
+    parser.add_argument('--config', action='append', default=[], metavar='PATH',
+                        help="JSON or TOML file with one or more parameter sets (repeatable).")
+    for name, (kind, default, _, expected) in SCHEMA.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=kind, default=None,
+                            help=f"{expected} (default: {default})")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="Write a summary CSV (and plots, see --plot-format) per run into DIR/run_NNN.")
+    parser.add_argument('--plot-format', action='append', choices=('png', 'svg'), default=[],
+                        help="Render report figures in this format into the run directory (repeatable).")
+    parser.add_argument('--verbosity', choices=VERBOSITY, default='summary',
+                        help="Amount of progress output (default: summary).")
+    parser.add_argument('--log-interval', type=int, default=1, metavar='N',
+                        help="Log every N-th generation at 'generation' verbosity.")
+    parser.add_argument('--log-file', metavar='PATH',
+                        help="Write progress to PATH instead of standard output.")
+    parser.add_argument('--json-log', action='store_true',
+                        help="Write progress as JSON lines.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Run every parameter set given on the command line in this process.
+
+    Parameter sets come from the ``--config`` files (one per file, or one per
+    entry of a file's ``runs`` list); individual flags override values in all
+    of them. Without ``--config`` a single run is made from the flags.
+
+    :param argv: Argument list (defaults to ``sys.argv[1:]``).
+    :return: List of the History of each run.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.log_interval < 1:
+        parser.error("--log-interval must be at least 1")
+    if args.plot_format and not args.output_dir:
+        parser.error("--plot-format requires --output-dir")
+    overrides = {name: getattr(args, name) for name in SCHEMA if getattr(args, name) is not None}
+
+    try:
+        if args.config:
+            runs = [validate_config({**params, **overrides}) for path in args.config for params in load_config(path)]
+        else:
+            runs = [validate_config(overrides)]
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    log_stream = open(args.log_file, 'a') if args.log_file else sys.stdout
+    histories = []
+    try:
+        logger = ProgressLogger(
+            log_stream, level=VERBOSITY[args.verbosity], interval=args.log_interval, structured=args.json_log
+        )
+        for index, params in enumerate(runs):
+            history = simulate(logger=logger, **params)
+            histories.append(history)
+            if args.output_dir:
+                _write_outputs(history, os.path.join(args.output_dir, f"run_{index:03d}"), args.plot_format)
+    finally:
+        if log_stream is not sys.stdout:
+            log_stream.close()
+    return histories
+
+
+def _write_outputs(history, run_dir, plot_formats):
+    os.makedirs(run_dir, exist_ok=True)
+    reporting.export_summary(history, os.path.join(run_dir, "summary.csv"))
+    if plot_formats:
+        reporting.render_report(history, run_dir, formats=plot_formats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import json
+import os
+
+from aggregate import ENGINES
+from alleles import GENETICS
+from mutation import MUTATION_RATE
+from selection import SAMPLERS
+
+PRESET_NAMES = ('default_cave', 'rich_cave', 'harsh_cave')
+TOPOLOGIES = ('chain', 'ring', 'grid', 'complete')
+
+
+def _positive(value):
+    return value > 0
+
+
+def _non_negative(value):
+    return value >= 0
+
+
+def _probability(value):
+    return 0 <= value <= 1
+
+
+# Parameter name -> (type, default, check, description of a valid value)
+SCHEMA = {
+    'num_decades': (int, 10, _positive, "a positive integer"),
+    'initial_population_size': (int, 100, _positive, "a positive integer"),
+    'preset_name': (str, 'default_cave', lambda value: value in PRESET_NAMES, f"one of {', '.join(PRESET_NAMES)}"),
+    'num_patches': (int, 1, _positive, "a positive integer"),
+    'fitness_threshold': (float, 0.5, None, "a number"),
+    'egg_count': (int, 50, _positive, "a positive integer"),
+    'carrying_capacity': (int, 1000, _non_negative, "a non-negative integer"),
+    'selection_method': (str, 'cumulative', lambda value: value in SAMPLERS, f"one of {', '.join(SAMPLERS)}"),
+    'mutation_rate': (float, MUTATION_RATE, _probability, "a probability between 0 and 1"),
+    'light_levels': (int, None, lambda value: value >= 2, "an integer of at least 2, or null"),
+    'topology': (str, None, lambda value: value in TOPOLOGIES, f"one of {', '.join(TOPOLOGIES)}, or null"),
+    'dispersal_rate': (float, 0.1, _probability, "a probability between 0 and 1"),
+    'genetics': (str, 'dense', lambda value: value in GENETICS, f"one of {', '.join(GENETICS)}"),
+    'engine': (str, 'individual', lambda value: value in ENGINES, f"one of {', '.join(ENGINES)}"),
+    'aggregate_threshold': (float, 0.1, _probability, "a fraction between 0 and 1"),
+    'seed': (int, None, _non_negative, "a non-negative integer, or null"),
+}
+
+
+def default_config():
+    """
+    Return a parameter set holding the default of every parameter.
+    """
+    return {name: default for name, (_, default, _, _) in SCHEMA.items()}
+
+
+def simulation_params(**params):
+    """
+    Return a full parameter set: the given parameters over the schema defaults.
+
+    Values are taken as they are (see ``validate_config`` for checking them),
+    so programmatic callers can pass e.g. a Generator as ``seed``.
+
+    :raises TypeError: If a parameter is not in the schema.
+    """
+    unknown = set(params) - set(SCHEMA)
+    if unknown:
+        raise TypeError(f"Unknown simulation parameter(s): {', '.join(sorted(unknown))}")
+    return {**default_config(), **params}
+
+
+def validate_config(params):
+    """
+    Check a parameter set against the schema and fill in defaults.
+
+    :param params: Dictionary of simulation parameters (missing ones take their default).
+    :return: A new dictionary with every parameter of the schema.
+    :raises ValueError: If a parameter is unknown or has an invalid value.
+    """
+    unknown = set(params) - set(SCHEMA)
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+
+    config = default_config()
+    for name, value in params.items():
+        kind, default, check, expected = SCHEMA[name]
+        if value is None and default is None:
+            config[name] = None
+            continue
+        # bool is an int subclass but never a meaningful count or rate here
+        if isinstance(value, bool) or not isinstance(value, (int, float) if kind is float else kind):
+            raise ValueError(f"Parameter '{name}' must be {expected}, got {value!r}")
+        value = kind(value)
+        if check is not None and not check(value):
+            raise ValueError(f"Parameter '{name}' must be {expected}, got {value!r}")
+        config[name] = value
+    return config
+
+
+def load_config(path):
+    """
+    Read one or more parameter sets from a JSON or TOML file.
+
+    The file holds simulation parameters at the top level. If it also has a
+    ``runs`` list, every entry is a parameter set that overrides the
+    top-level values; otherwise the top level is the only parameter set.
+
+    :param path: Path to a ``.json`` or ``.toml`` file.
+    :return: List of validated parameter sets.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as handle:
+            data = tomllib.load(handle)
+    elif extension == '.json':
+        with open(path) as handle:
+            data = json.load(handle)
+    else:
+        raise ValueError(f"Unsupported config file type: {path}")
+
+    if not isinstance(data, dict):
+        raise ValueError("A config file must contain a table of parameters.")
+    shared = {key: value for key, value in data.items() if key != 'runs'}
+    runs = data.get('runs', [{}])
+    if not isinstance(runs, list) or not all(isinstance(run, dict) for run in runs):
+        raise ValueError("'runs' must be a list of parameter tables.")
+    return [validate_config({**shared, **run}) for run in runs]
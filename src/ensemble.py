@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from history import EnsembleResult
+from progress import QUIET, ProgressLogger
+from rng import spawn_rngs
+from simulation import simulate
+
+
+def _run_replicate(args):
+    rng, simulation_kwargs = args
+    return simulate(seed=rng, logger=ProgressLogger(level=QUIET), **simulation_kwargs)
+
+
+def run_ensemble(num_replicates, num_decades, initial_population_size, preset_name, seed=None, max_workers=None, **simulation_kwargs):
+    """
+    Run independent replicates of the simulation across a process pool.
+
+    Each replicate gets its own child of ``SeedSequence(seed)``, so a given
+    seed reproduces the whole ensemble regardless of the number of workers.
+
+    :param num_replicates: Number of replicate runs.
+    :param num_decades: Simulation runtime in decades.
+    :param initial_population_size: Founding population size.
+    :param preset_name: Cave preset name.
+    :param seed: Root seed of the ensemble (optional, fresh entropy if None).
+    :param max_workers: Number of worker processes (defaults to the CPU count).
+    :param simulation_kwargs: Further keyword arguments for ``simulate``.
+    :return: An EnsembleResult.
+    """
+    rngs = spawn_rngs(seed, num_replicates)
+    simulation_kwargs = dict(
+        simulation_kwargs,
+        num_decades=num_decades,
+        initial_population_size=initial_population_size,
+        preset_name=preset_name,
+    )
+    jobs = [(rng, simulation_kwargs) for rng in rngs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        histories = list(executor.map(_run_replicate, jobs))
+    return EnsembleResult(histories, num_decades * 10, [rng.bit_generator.seed_seq for rng in rngs])
@@ -1,35 +1,94 @@
-import random
+from collections.abc import MutableMapping
+
+import numpy as np
+from organism import TRAITS
+from rng import get_rng
+
+# Patch keys backed by a per-field array on the Environment
+PATCH_FIELDS = {
+    'light_level': 'light',
+    'food_availability': 'food',
+    'temperature': 'temperature',
+}
 
 class Environment:
-    def __init__(self, num_patches=1, preset=None):
+    def __init__(self, num_patches=1, preset=None, rng=None, network=None):
         """
         Initialize the environment with a specified number of patches.
         Each patch represents a separate area with environmental conditions.
+
+        Conditions are stored per field in NumPy arrays (``light``, ``food``,
+        ``temperature``) and ``optimal`` holds the optimal traits as a matrix of
+        shape (num_traits, num_patches). ``patches`` gives dict-like views of
+        the same data for code that works patch by patch.
         
         :param num_patches: Number of environmental patches.
         :param preset: Preset environmental configuration (optional).
+        :param rng: numpy.random.Generator for all random changes (optional).
+        :param network: CaveNetwork connecting the patches (optional). Without
+                        one, organisms move to a uniformly random patch every
+                        generation.
         """
-        self.patches = []
+        self.rng = get_rng(rng)
+        self.network = network
+        self.block_size = None
+        self.trait_names = TRAITS
         if preset:
             # Initialize environment based on a preset
-            for _ in range(num_patches):
-                # Ensure a deep copy of the preset to avoid shared references
-                patch = preset.copy()
-                patch['optimal_traits'] = preset['optimal_traits'].copy()
-                self.patches.append(patch)
+            self.light = np.full(num_patches, preset['light_level'], dtype=np.float64)
+            self.food = np.full(num_patches, preset['food_availability'], dtype=np.float64)
+            self.temperature = np.full(num_patches, preset['temperature'], dtype=np.float64)
+            optimal_traits = preset['optimal_traits']
+            extra = {key: value for key, value in preset.items() if key not in PATCH_FIELDS and key != 'optimal_traits'}
         else:
             # Default random initialization for patches
-            for _ in range(num_patches):
-                self.patches.append({
-                    'light_level': random.uniform(0, 1),
-                    'food_availability': random.uniform(0, 1),
-                    'temperature': random.uniform(10, 20),
-                    'optimal_traits': {
-                        'pigmentation': 0.0,
-                        'eye_size': 0.0,
-                        'metabolic_rate': 0.3,
-                    }
-                })
+            self.light = self.rng.uniform(0, 1, num_patches)
+            self.food = self.rng.uniform(0, 1, num_patches)
+            self.temperature = self.rng.uniform(10, 20, num_patches)
+            optimal_traits = {
+                'pigmentation': 0.0,
+                'eye_size': 0.0,
+                'metabolic_rate': 0.3,
+            }
+            extra = {}
+        self.optimal = np.array(
+            [np.full(num_patches, optimal_traits[trait], dtype=np.float64) for trait in self.trait_names]
+        ).reshape(len(self.trait_names), num_patches)
+        # Per-patch storage for keys that have no backing array
+        self.extra = [extra.copy() for _ in range(num_patches)]
+        self.patches = [PatchView(self, p) for p in range(num_patches)]
+
+    @classmethod
+    def from_arrays(cls, light, food, temperature, optimal, extra=None, rng=None, network=None, block_size=None):
+        """
+        Build an environment directly from its per-field arrays.
+
+        :param light: Light level per patch.
+        :param food: Food availability per patch.
+        :param temperature: Temperature per patch.
+        :param optimal: Optimal-trait matrix of shape (num_traits, num_patches).
+        :param extra: Per-patch dictionaries of additional keys (optional).
+        :param rng: numpy.random.Generator for all random changes (optional).
+        :param network: CaveNetwork connecting the patches (optional).
+        :param block_size: Split the patches into independent blocks of this
+                           many patches, e.g. the replicates of a batched run
+                           (optional). Organisms never disperse out of their
+                           block; a network must not connect blocks either.
+        """
+        environment = cls(num_patches=0, rng=rng, network=network)
+        environment.block_size = block_size
+        environment.light = np.array(light, dtype=np.float64)
+        environment.food = np.array(food, dtype=np.float64)
+        environment.temperature = np.array(temperature, dtype=np.float64)
+        environment.optimal = np.array(optimal, dtype=np.float64).reshape(len(environment.trait_names), -1)
+        num_patches = len(environment.light)
+        environment.extra = [dict(patch_extra) for patch_extra in extra] if extra is not None else [{} for _ in range(num_patches)]
+        environment.patches = [PatchView(environment, p) for p in range(num_patches)]
+        return environment
+
+    @property
+    def num_patches(self):
+        return len(self.light)
 
     def change_conditions(self, changes=None):
         """
@@ -38,14 +97,112 @@ class Environment:
         :param changes: Dictionary of condition updates (optional).
                         If None, random changes are applied.
         """
-        for patch in self.patches:
-            if changes:
-                for key, value in changes.items():
-                    patch[key] = value
+        if changes:
+            for key, value in changes.items():
+                if key in PATCH_FIELDS:
+                    getattr(self, PATCH_FIELDS[key])[:] = value
+                elif key == 'optimal_traits':
+                    for trait, trait_value in value.items():
+                        self.optimal[self.trait_names.index(trait)] = trait_value
+                else:
+                    for extra in self.extra:
+                        extra[key] = value
+        else:
+            # Apply a bounded random walk to every patch at once
+            for field in (self.light, self.food):
+                field += self.rng.uniform(-0.1, 0.1, self.num_patches)
+                np.clip(field, 0, 1, out=field)
+
+    def optimal_matrix(self, trait_names=None):
+        """
+        Return the optimal-trait matrix with rows in the given trait order.
+
+        :param trait_names: Trait order of the rows (defaults to ``self.trait_names``).
+        :return: Array of shape (num_traits, num_patches).
+        """
+        if trait_names is None or tuple(trait_names) == self.trait_names:
+            return self.optimal
+        return self.optimal[[self.trait_names.index(trait) for trait in trait_names]]
+
+    def patch_capacity(self, capacity):
+        """
+        Split a carrying capacity as evenly as possible over the patches.
+
+        When the patches are split into blocks (see ``from_arrays``), every
+        block gets the full capacity.
+
+        :param capacity: Total carrying capacity.
+        :return: Integer array with the capacity of every patch.
+        """
+        size = self.block_size or self.num_patches
+        share = capacity // size + (np.arange(size) < capacity % size)
+        return np.tile(share, self.num_patches // size) if size else share
+
+    def random_patch_indices(self, size):
+        """
+        Draw a uniformly random patch index for each of ``size`` organisms.
+        """
+        if not self.num_patches:
+            raise ValueError("Environment has no patches available.")
+        return self.rng.integers(self.num_patches, size=size)
+
+    def disperse(self, patch):
+        """
+        Return the patch of every organism after one generation of movement.
+
+        With a cave network organisms migrate along its edges, and organisms
+        not yet placed (patch -1) start in a uniformly random patch. Without a
+        network every organism moves to a uniformly random patch, of its own
+        block if the patches are split into blocks.
+
+        :param patch: Current patch index of each organism.
+        """
+        if self.network is None:
+            if self.block_size is None:
+                return self.random_patch_indices(len(patch))
+            return (patch // self.block_size) * self.block_size + self.rng.integers(self.block_size, size=len(patch))
+        unplaced = patch < 0
+        if unplaced.any():
+            patch = patch.copy()
+            patch[unplaced] = self.random_patch_indices(int(unplaced.sum()))
+        return self.network.migrate(patch, self.rng)
+
+    def disperse_counts(self, patch, count):
+        """
+        Move groups of identical organisms for one generation, like ``disperse``.
+
+        The ``count[k]`` organisms of group ``k`` in ``patch[k]`` are split
+        over their destination patches with one multinomial draw per group.
+
+        :param patch: Current patch index of each group.
+        :param count: Number of organisms in each group.
+        :return: Tuple (group, patch, count) with the group every non-empty
+                 piece comes from, its new patch and its size.
+        """
+        patch = np.asarray(patch, dtype=np.intp)
+        count = np.asarray(count, dtype=np.int64)
+        group = np.arange(len(patch))
+        unplaced = patch < 0 if self.network is not None else np.ones(len(patch), dtype=bool)
+        if unplaced.any():
+            moving = np.flatnonzero(unplaced)
+            if count[moving].sum() <= len(moving) * self.num_patches:
+                # Fewer organisms than (group, patch) cells: place them one by one
+                organism = np.repeat(moving, count[moving])
+                cell, cell_count = np.unique(
+                    organism * self.num_patches + self.random_patch_indices(len(organism)), return_counts=True
+                )
+                piece, destination, split_count = cell // self.num_patches, cell % self.num_patches, cell_count
             else:
-                # Apply random changes within bounds
-                patch['light_level'] = max(0, min(1, patch['light_level'] + random.uniform(-0.1, 0.1)))
-                patch['food_availability'] = max(0, min(1, patch['food_availability'] + random.uniform(-0.1, 0.1)))
+                split = self.rng.multinomial(count[moving], np.full(self.num_patches, 1 / self.num_patches))
+                position, destination = np.nonzero(split)
+                piece, split_count = moving[position], split[position, destination]
+            group = np.concatenate((group[~unplaced], piece))
+            patch = np.concatenate((patch[~unplaced], destination))
+            count = np.concatenate((count[~unplaced], split_count))
+        if self.network is None:
+            return group, patch, count
+        piece, patch, count = self.network.split_counts(patch, count, self.rng)
+        return group[piece], patch, count
 
     def get_patch(self):
         """
@@ -55,7 +212,7 @@ class Environment:
         """
         if not self.patches:
             raise ValueError("Environment has no patches available.")
-        return random.choice(self.patches)
+        return self.patches[self.rng.integers(len(self.patches))]
 
     @staticmethod
     def cave_presets(preset_name):
@@ -98,3 +255,78 @@ class Environment:
             }
         }
         return presets.get(preset_name, presets["default_cave"])
+
+
+class PatchView(MutableMapping):
+    """
+    Dict-like view of one patch of an Environment.
+    """
+    def __init__(self, environment, index):
+        self._environment = environment
+        self._index = index
+
+    def __getitem__(self, key):
+        if key in PATCH_FIELDS:
+            return float(getattr(self._environment, PATCH_FIELDS[key])[self._index])
+        if key == 'optimal_traits':
+            return OptimalTraitsView(self._environment, self._index)
+        return self._environment.extra[self._index][key]
+
+    def __setitem__(self, key, value):
+        if key in PATCH_FIELDS:
+            getattr(self._environment, PATCH_FIELDS[key])[self._index] = value
+        elif key == 'optimal_traits':
+            view = OptimalTraitsView(self._environment, self._index)
+            for trait, trait_value in value.items():
+                view[trait] = trait_value
+        else:
+            self._environment.extra[self._index][key] = value
+
+    def __delitem__(self, key):
+        if key in PATCH_FIELDS or key == 'optimal_traits':
+            raise TypeError(f"Patch field '{key}' cannot be deleted.")
+        del self._environment.extra[self._index][key]
+
+    def __iter__(self):
+        yield from PATCH_FIELDS
+        yield 'optimal_traits'
+        yield from self._environment.extra[self._index]
+
+    def __len__(self):
+        return len(PATCH_FIELDS) + 1 + len(self._environment.extra[self._index])
+
+    def __repr__(self):
+        return repr({key: dict(value) if key == 'optimal_traits' else value for key, value in self.items()})
+
+
+class OptimalTraitsView(MutableMapping):
+    """
+    Dict-like view of the optimal traits of one patch.
+    """
+    def __init__(self, environment, index):
+        self._environment = environment
+        self._index = index
+
+    def _row(self, trait):
+        try:
+            return self._environment.trait_names.index(trait)
+        except ValueError:
+            raise KeyError(trait) from None
+
+    def __getitem__(self, trait):
+        return float(self._environment.optimal[self._row(trait), self._index])
+
+    def __setitem__(self, trait, value):
+        self._environment.optimal[self._row(trait), self._index] = value
+
+    def __delitem__(self, trait):
+        raise TypeError("Optimal traits cannot be deleted.")
+
+    def __iter__(self):
+        return iter(self._environment.trait_names)
+
+    def __len__(self):
+        return len(self._environment.trait_names)
+
+    def __repr__(self):
+        return repr(dict(self))
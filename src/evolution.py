@@ -1,8 +1,72 @@
+import numpy as np
+
+# Steepness and midpoint of the logistic response of visual traits to light
+LIGHT_RESPONSE_STEEPNESS = 10
+LIGHT_RESPONSE_MIDPOINT = 0.5
+MIN_METABOLIC_RATE = 0.1
+
+
+def logistic(x):
+    """
+    Numerically stable logistic function on scalars or arrays.
+
+    ``exp`` is only ever evaluated on non-positive arguments, so it cannot
+    overflow for large ``|x|``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    e = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1 / (1 + e), e / (1 + e))
+
+
+def light_response(light_level):
+    """
+    Optimal pigmentation and eye size for the given light level(s).
+    """
+    return logistic(LIGHT_RESPONSE_STEEPNESS * (np.asarray(light_level) - LIGHT_RESPONSE_MIDPOINT))
+
+
+class LogisticLookup:
+    def __init__(self, levels=256):
+        """
+        Precomputed light response for light levels quantized to a grid.
+
+        :param levels: Number of evenly spaced light levels in [0, 1].
+        """
+        if levels < 2:
+            raise ValueError("A lookup table needs at least two light levels.")
+        self.levels = levels
+        self.table = light_response(np.linspace(0, 1, levels))
+
+    def __call__(self, light_level):
+        """
+        Look up the light response, rounding each light level to the nearest grid point.
+        """
+        index = np.rint(np.clip(light_level, 0, 1) * (self.levels - 1)).astype(np.intp)
+        return self.table[index]
+
+
 def update_optimal_traits(patch: dict):
     light_level = patch.get('light_level')
     food_availability = patch.get('food_availability')
 
     # Logistic scaling for traits
-    patch['optimal_traits']['pigmentation'] = 1 / (1 + pow(2.718, -10 * (light_level - 0.5)))
-    patch['optimal_traits']['eye_size'] = 1 / (1 + pow(2.718, -10 * (light_level - 0.5)))
-    patch['optimal_traits']['metabolic_rate'] = max(0.1, food_availability)
+    response = float(light_response(light_level))
+    patch['optimal_traits']['pigmentation'] = response
+    patch['optimal_traits']['eye_size'] = response
+    patch['optimal_traits']['metabolic_rate'] = max(MIN_METABOLIC_RATE, food_availability)
+
+
+def update_optimal_traits_batch(environment, lookup=None):
+    """
+    Update the optimal-trait matrix of every patch of the environment at once.
+
+    Gives the same values as calling ``update_optimal_traits`` on each patch.
+
+    :param environment: Environment with ``light``, ``food`` and ``optimal`` arrays.
+    :param lookup: Optional LogisticLookup used instead of evaluating the logistic.
+    """
+    response = light_response(environment.light) if lookup is None else lookup(environment.light)
+    rows = environment.trait_names
+    environment.optimal[rows.index('pigmentation')] = response
+    environment.optimal[rows.index('eye_size')] = response
+    environment.optimal[rows.index('metabolic_rate')] = np.maximum(MIN_METABOLIC_RATE, environment.food)
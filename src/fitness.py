@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def batch_fitness(traits, patch_index, optimal, out=None):
+    """
+    Calculate the fitness of every organism at once.
+
+    Same semantics as ``Organism.calculate_fitness``: the mean over traits of
+    ``1 - |value - optimal|``, with the optimum taken from each organism's patch.
+    Terms are summed trait by trait in the same order, so results match the
+    per-organism method exactly.
+
+    :param traits: Array of shape (num_traits, size).
+    :param patch_index: Patch index per organism, shape (size,).
+    :param optimal: Optimal trait matrix of shape (num_traits, num_patches).
+    :param out: Optional array of shape (size,) to write the result into.
+    :return: Fitness per organism.
+    """
+    return np.divide(
+        (1 - np.abs(traits - optimal[:, patch_index])).sum(axis=0),
+        len(traits),
+        out=out,
+    )
@@ -0,0 +1,81 @@
+import numpy as np
+from patch_index import PatchIndex
+from reproduction import allocate_offspring_by_patch, expected_offspring
+from selection import select_local_mates
+
+
+def select_viable(population, environment, fitness_threshold, rng):
+    """
+    Disperse the population, evaluate its fitness and keep the viable organisms.
+
+    An organism is viable if its fitness reaches the threshold, jittered by
+    up to 0.1 either way per organism.
+
+    :return: A new population holding the viable organisms.
+    """
+    population.move_to_patches(environment)
+    population.calculate_fitness(environment)
+
+    # Filter viable population based on fitness
+    thresholds = fitness_threshold + rng.uniform(-0.1, 0.1, len(population))
+    return population.take(population.fitness >= thresholds)
+
+
+def breed(viable_population, environment, params, rng):
+    """
+    Produce the next generation from the viable organisms.
+
+    Offspring are drawn per patch, mutated, dispersed and evaluated against
+    ``environment``. The carrying capacity is split over the patches (see
+    ``Environment.patch_capacity``) and every patch caps its own offspring.
+
+    :param viable_population: Population (dense or allele-coded) of the parents.
+    :param params: Simulation parameters.
+    :return: Tuple (offspring_population, mean egg survival rate).
+    """
+    egg_count = params['egg_count']
+
+    # Group the viable organisms by patch; mating and survival are local
+    patch_index = PatchIndex(viable_population.patch, environment.num_patches)
+
+    # Calculate the egg survival rate of every patch from its food availability
+    patch_survival_rate = (1+environment.food)**2/(egg_count)
+    egg_survival_rate = patch_survival_rate[viable_population.patch]
+
+    # Generate offspring based on fitness and survival rate, capped at every patch's carrying capacity
+    fitness = viable_population.fitness
+    num_offspring = allocate_offspring_by_patch(
+        expected_offspring(fitness, egg_count, egg_survival_rate, rng=rng),
+        patch_index, environment.patch_capacity(params['carrying_capacity']), rng=rng,
+    )
+    focal = np.repeat(np.arange(len(viable_population)), num_offspring)
+
+    # Pick a fitness-weighted mate from the focal parent's patch for every offspring in one batch
+    mates = select_local_mates(fitness, patch_index, focal, method=params['selection_method'], rng=rng)
+
+    offspring_population = viable_population.reproduce(mates, focal, rng=rng)
+    offspring_population.mutate(params['mutation_rate'], rng=rng)
+    # Offspring start in their focal parent's patch before dispersing
+    offspring_population.patch = viable_population.patch[focal]
+    offspring_population.move_to_patches(environment)
+    offspring_population.calculate_fitness(environment)
+
+    return offspring_population, float(egg_survival_rate.mean())
+
+
+def individual_generation(population, environment, params, rng):
+    """
+    Advance a population of individuals by one generation.
+
+    :param population: Population or AllelePopulation.
+    :param environment: Environment of the current generation.
+    :param params: Simulation parameters.
+    :param rng: numpy.random.Generator to draw from.
+    :return: Tuple (offspring, viable_size, egg_survival_rate), or None if no
+             organism is viable.
+    """
+    viable_population = select_viable(population, environment, params['fitness_threshold'], rng)
+    if not len(viable_population):
+        return None
+    offspring_population, egg_survival_rate = breed(viable_population, environment, params, rng)
+    return offspring_population, len(viable_population), egg_survival_rate
@@ -0,0 +1,114 @@
+import numpy as np
+from organism import TRAITS
+
+
+class History:
+    def __init__(self, trait_names=TRAITS):
+        """
+        Per-generation summary of a simulation run.
+
+        :param trait_names: Traits whose population averages are recorded.
+        """
+        self.population_sizes = []
+        self.average_fitness = []
+        self.trait_averages = {trait: [] for trait in trait_names}
+
+    @classmethod
+    def from_arrays(cls, population_sizes, average_fitness, trait_averages, trait_names=TRAITS):
+        """
+        Rebuild a History from the arrays returned by ``as_arrays``.
+        """
+        history = cls(trait_names)
+        history.population_sizes = [int(size) for size in population_sizes]
+        history.average_fitness = [float(value) for value in average_fitness]
+        for trait, averages in zip(trait_names, trait_averages):
+            history.trait_averages[trait] = [float(value) for value in averages]
+        return history
+
+    def __len__(self):
+        return len(self.population_sizes)
+
+    def observe(self, values):
+        """
+        Append a generation from the values of the metrics it was evaluated
+        with (see ``metrics.HISTORY_METRICS``); generations without them are
+        not recorded.
+
+        :param values: Dictionary returned by ``MetricRegistry.observe``.
+        """
+        if 'population_size' in values:
+            self.append(
+                values['population_size'],
+                values['average_fitness'],
+                dict(zip(self.trait_averages, values['trait_means'])),
+            )
+
+    def append(self, population_size, average_fitness, trait_means):
+        """
+        Append an already computed generation summary.
+
+        :param population_size: Number of organisms.
+        :param average_fitness: Mean fitness.
+        :param trait_means: Mapping of trait name to mean trait value.
+        """
+        self.population_sizes.append(int(population_size))
+        self.average_fitness.append(float(average_fitness))
+        for trait in self.trait_averages:
+            self.trait_averages[trait].append(float(trait_means[trait]))
+
+    def as_arrays(self):
+        """
+        Return the history as NumPy arrays.
+
+        :return: Tuple (population_sizes, average_fitness, trait_averages) where
+                 trait_averages has shape (num_traits, num_generations).
+        """
+        return (
+            np.asarray(self.population_sizes, dtype=np.int64),
+            np.asarray(self.average_fitness, dtype=np.float64),
+            np.array(list(self.trait_averages.values()), dtype=np.float64).reshape(len(self.trait_averages), len(self)),
+        )
+
+
+class EnsembleResult:
+    def __init__(self, histories, num_generations, seed_sequences=None, labels=None):
+        """
+        Stacked results of replicate simulation runs.
+
+        Replicates that went extinct early are padded: population sizes with 0
+        and fitness and trait averages with NaN.
+
+        :param histories: History of each replicate, in replicate order.
+        :param num_generations: Number of generations every replicate was asked to run.
+        :param seed_sequences: SeedSequence each replicate's generator was built from (optional).
+        :param labels: Label of each replicate, e.g. its cave preset (optional).
+        """
+        num_replicates = len(histories)
+        trait_names = tuple(histories[0].trait_averages) if histories else ()
+        self.trait_names = trait_names
+        self.histories = histories
+        self.seed_sequences = seed_sequences
+        self.labels = labels
+        self.generations_run = np.array([len(history) for history in histories], dtype=np.int64)
+        self.population_sizes = np.zeros((num_replicates, num_generations), dtype=np.int64)
+        self.average_fitness = np.full((num_replicates, num_generations), np.nan)
+        self.trait_averages = np.full((num_replicates, len(trait_names), num_generations), np.nan)
+        for r, history in enumerate(histories):
+            sizes, fitness, traits = history.as_arrays()
+            self.population_sizes[r, :len(sizes)] = sizes
+            self.average_fitness[r, :len(fitness)] = fitness
+            self.trait_averages[r, :, :traits.shape[1]] = traits
+
+    @property
+    def extinct(self):
+        """
+        Whether each replicate went extinct before its last generation.
+        """
+        return self.generations_run < self.population_sizes.shape[1]
+
+    @property
+    def extinction_probability(self):
+        """
+        Fraction of replicates that went extinct.
+        """
+        return float(self.extinct.mean()) if len(self.extinct) else 0.0
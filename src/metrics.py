@@ -0,0 +1,197 @@
+import numpy as np
+from patch_index import PatchIndex
+from streaming import COMPRESSION, StreamingStatistics
+
+# Quantile levels reported by the 'quantiles' metric
+QUANTILE_LEVELS = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Built-in metrics a History is made of, subscribed every generation by default
+HISTORY_METRICS = ('population_size', 'average_fitness', 'trait_means')
+
+
+def _weights(context):
+    counts = context.record.counts
+    return np.ones(len(context.record.fitness)) if counts is None else counts.astype(np.float64)
+
+
+def _allele_codes(context):
+    population = context.record.population
+    if hasattr(population, 'codes'):
+        return [(codes, len(table)) for codes, table in zip(population.codes, population.alleles)]
+    codes = []
+    for values in context['traits']:
+        table, inverse = np.unique(values, return_inverse=True)
+        codes.append((inverse.reshape(-1), len(table)))
+    return codes
+
+
+def _summary(compression):
+    def build(context):
+        record = context.record
+        statistics = StreamingStatistics(('fitness',) + record.trait_names, len(record.patch_sizes), compression)
+        values = np.vstack((context['fitness'][None, :], context['traits']))
+        return statistics.update(values, context['patch'], context['weights'])
+    return build
+
+
+# Data a metric can ask for, by name -> how to compute it from a MetricContext
+INTERMEDIATES = {
+    'population': lambda context: context.record.population,
+    'traits': lambda context: context.record.traits,
+    'fitness': lambda context: context.record.fitness,
+    'patch': lambda context: context.record.patch,
+    'weights': _weights,
+    'patch_sizes': lambda context: context.record.patch_sizes,
+    'patch_index': lambda context: PatchIndex(context['patch'], len(context.record.patch_sizes)),
+    'allele_codes': _allele_codes,
+    'moments': _summary(None),
+    'statistics': _summary(COMPRESSION),
+}
+
+
+class MetricContext:
+    def __init__(self, record):
+        """
+        Lazily computed data shared by the metrics of one generation.
+
+        ``context[name]`` computes the intermediate ``name`` (see
+        ``INTERMEDIATES``) on first access and caches it, so metrics that
+        need the same data share one computation.
+
+        :param record: The GenerationRecord of the generation.
+        """
+        self.record = record
+        self._cache = {}
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            self._cache[name] = INTERMEDIATES[name](self)
+        return self._cache[name]
+
+
+class Metric:
+    def __init__(self, name, compute, needs=(), every=1, skip_empty=True):
+        """
+        A quantity recorded during a run.
+
+        :param name: Name the results are stored under.
+        :param compute: Function called with one keyword argument per entry of
+                        ``needs`` and returning the value of the metric.
+        :param needs: Names of the intermediates the metric uses (see ``INTERMEDIATES``).
+        :param every: Evaluate every ``every``-th generation.
+        :param skip_empty: Do not evaluate in generations that ended without organisms.
+        """
+        unknown = set(needs) - set(INTERMEDIATES)
+        if unknown:
+            raise ValueError(f"Unknown metric input(s): {', '.join(sorted(unknown))}")
+        if every < 1:
+            raise ValueError("Metric cadence must be at least 1.")
+        self.name = name
+        self.compute = compute
+        self.needs = tuple(needs)
+        self.every = every
+        self.skip_empty = skip_empty
+
+    def due(self, record):
+        return record.generation % self.every == 0 and (record.population_size > 0 or not self.skip_empty)
+
+    def evaluate(self, context):
+        return self.compute(**{need: context[need] for need in self.needs})
+
+
+def _heterozygosity(allele_codes, weights):
+    total = weights.sum()
+    result = []
+    for codes, num_alleles in allele_codes:
+        frequency = np.bincount(codes, weights=weights, minlength=num_alleles) / total
+        result.append(1 - frequency @ frequency)
+    return np.array(result)
+
+
+# Built-in metrics: name -> (compute, needs, skip_empty)
+BUILTIN_METRICS = {
+    'population_size': (lambda population: len(population), ('population',), False),
+    'average_fitness': (lambda population: population.mean_fitness(), ('population',), False),
+    'trait_means': (lambda population: np.array(list(population.trait_means().values())), ('population',), False),
+    'patch_sizes': (lambda patch_sizes: patch_sizes.copy(), ('patch_sizes',), False),
+    'patch_means': (lambda moments: moments.mean, ('moments',), True),
+    'patch_variance': (lambda moments: moments.variance, ('moments',), True),
+    'quantiles': (lambda statistics: statistics.quantile(QUANTILE_LEVELS), ('statistics',), True),
+    'heterozygosity': (_heterozygosity, ('allele_codes', 'weights'), True),
+}
+
+
+class MetricRegistry:
+    def __init__(self, history=True):
+        """
+        Set of metrics evaluated while a run progresses.
+
+        Only subscribed metrics are computed, each at its own cadence, and
+        the intermediates they share are computed once per generation; in a
+        generation where no metric is due nothing is computed at all. Results
+        are kept in ``results`` as lists of (generation, value) pairs.
+
+        :param history: Subscribe the metrics the run's History is recorded
+                        from (see ``HISTORY_METRICS``) every generation. Without
+                        them the History of a run stays empty. The History
+                        needs all of them in every generation, so they cannot
+                        be registered one by one or at another cadence.
+        """
+        self.metrics = {}
+        self.results = {}
+        if history:
+            for name in HISTORY_METRICS:
+                compute, needs, skip_empty = BUILTIN_METRICS[name]
+                self._register(Metric(name, compute, needs, 1, skip_empty))
+
+    def add(self, metric):
+        """
+        Register a Metric.
+
+        :return: The metric.
+        """
+        if metric.name in HISTORY_METRICS:
+            raise ValueError(f"Metric '{metric.name}' is recorded with the History; use MetricRegistry(history=True).")
+        return self._register(metric)
+
+    def subscribe(self, name, every=1):
+        """
+        Register one of the built-in metrics (see ``BUILTIN_METRICS``).
+
+        :param name: Name of the built-in metric.
+        :param every: Evaluate every ``every``-th generation.
+        :return: The metric.
+        """
+        if name not in BUILTIN_METRICS:
+            raise ValueError(f"Unknown metric: {name}")
+        compute, needs, skip_empty = BUILTIN_METRICS[name]
+        return self.add(Metric(name, compute, needs, every, skip_empty))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        self.results[metric.name] = []
+        return metric
+
+    def observe(self, record):
+        """
+        Evaluate the metrics due in the generation of ``record``.
+
+        :param record: A GenerationRecord.
+        :return: Dictionary of the values computed in this generation.
+        """
+        due = [metric for metric in self.metrics.values() if metric.due(record)]
+        if not due:
+            return {}
+        context = MetricContext(record)
+        values = {metric.name: metric.evaluate(context) for metric in due}
+        for name, value in values.items():
+            self.results[name].append((record.generation, value))
+        return values
+
+    def series(self, name):
+        """
+        Return the generations and values recorded for a metric as arrays.
+        """
+        generations = np.array([generation for generation, _ in self.results[name]], dtype=np.int64)
+        return generations, np.array([value for _, value in self.results[name]])
@@ -0,0 +1,48 @@
+import numpy as np
+from rng import get_rng
+
+# Per-trait, per-generation mutation probability and Gaussian effect size
+MUTATION_RATE = 5.97e-9
+MUTATION_SCALE = 0.0001
+
+
+def sparse_mutate(traits, mutation_rate=MUTATION_RATE, scale=MUTATION_SCALE, rng=None):
+    """
+    Mutate a trait matrix in place by sampling only the mutation events.
+
+    Instead of one uniform draw per (trait, organism) slot, the number of
+    events is drawn once from Binomial(num_slots, mutation_rate) and only that
+    many slots receive a Gaussian effect. Slots are drawn uniformly with
+    replacement; a slot hit twice receives both effects, which at realistic
+    rates happens with negligible probability.
+
+    :param traits: Array of shape (num_traits, size), modified in place.
+    :param mutation_rate: Probability that a single trait value mutates.
+    :param scale: Standard deviation of the mutation effect.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Tuple (trait_index, organism_index) of the mutated slots.
+    """
+    if not traits.flags.c_contiguous:
+        raise ValueError("Trait matrix must be C-contiguous to be mutated in place.")
+
+    slots, effects = draw_mutations(traits.size, mutation_rate, scale, rng)
+    np.add.at(traits.reshape(-1), slots, effects)
+    return np.unravel_index(slots, traits.shape)
+
+
+def draw_mutations(num_slots, mutation_rate=MUTATION_RATE, scale=MUTATION_SCALE, rng=None):
+    """
+    Draw the mutation events of one generation without applying them.
+
+    :param num_slots: Number of (trait, organism) slots.
+    :param mutation_rate: Probability that a single trait value mutates.
+    :param scale: Standard deviation of the mutation effect.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Tuple (slots, effects) with the flat slot index and the Gaussian
+             effect of every event, in draw order.
+    """
+    rng = get_rng(rng)
+    num_events = rng.binomial(num_slots, mutation_rate) if num_slots else 0
+    if not num_events:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    return rng.integers(num_slots, size=num_events), rng.normal(0, scale, num_events)
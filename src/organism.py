@@ -1,31 +1,40 @@
-import random
 import numpy as np
+from rng import get_rng
+
+TRAITS = ('pigmentation', 'eye_size', 'metabolic_rate')
+
+# Uniform ranges used to draw the traits of a founding organism
+INITIAL_TRAIT_RANGES = {
+    'pigmentation': (0.5, 1),
+    'eye_size': (0.5, 1),
+    'metabolic_rate': (0, 1),
+}
+
 class Organism:
-    def __init__(self, genetics=None):
+    def __init__(self, genetics=None, rng=None):
         if genetics is not None:
             self.genetics = genetics
         else:
-            self.genetics = {
-                'pigmentation': random.uniform(0.5, 1),
-                'eye_size': random.uniform(0.5, 1),
-                'metabolic_rate': random.uniform(0, 1),
-            }
+            low, high = np.array([INITIAL_TRAIT_RANGES[trait] for trait in TRAITS]).T
+            values = get_rng(rng).uniform(low, high)
+            self.genetics = {trait: float(value) for trait, value in zip(TRAITS, values)}
         self.fitness = 0
         self.environment_patch = None  # For spatial structure
 
-    def mutate(self, mutation_rate):
-        for trait in self.genetics:
-            if random.random() < mutation_rate:
-                mutation_amount = random.gauss(0, 0.0001)
+    def mutate(self, mutation_rate, rng=None):
+        rng = get_rng(rng)
+        hits = rng.random(len(self.genetics)) < mutation_rate
+        for trait, hit in zip(list(self.genetics), hits):
+            if hit:
+                mutation_amount = rng.normal(0, 0.0001)
                 self.genetics[trait] += mutation_amount
 
     @staticmethod
-    def reproduce(parent1, parent2):
+    def reproduce(parent1, parent2, rng=None):
+        from_first = get_rng(rng).integers(2, size=len(parent1.genetics), dtype=bool)
         child_genetics = {
-            trait: random.choice(
-                [parent1.genetics[trait], parent2.genetics[trait]]
-            )
-            for trait in parent1.genetics
+            trait: parent1.genetics[trait] if first else parent2.genetics[trait]
+            for trait, first in zip(parent1.genetics, from_first)
         }
         return Organism(genetics=child_genetics)
 
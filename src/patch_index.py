@@ -0,0 +1,27 @@
+import numpy as np
+
+
+class PatchIndex:
+    def __init__(self, patch, num_patches):
+        """
+        Grouping of organisms by the patch they occupy.
+
+        ``order`` lists organism indices sorted by patch (stable, so organisms
+        keep their relative order within a patch) and the members of patch
+        ``p`` are ``order[offsets[p]:offsets[p + 1]]``. Building the index is a
+        single sort; per-patch aggregates are O(N) ``np.bincount`` passes.
+
+        :param patch: Patch index of every organism.
+        :param num_patches: Number of patches in the environment.
+        """
+        self.patch = np.asarray(patch, dtype=np.intp)
+        self.num_patches = num_patches
+        self.sizes = np.bincount(self.patch, minlength=num_patches)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+        self.order = np.argsort(self.patch, kind='stable')
+
+    def members(self, p):
+        """
+        Return the indices of the organisms in patch ``p``.
+        """
+        return self.order[self.offsets[p]:self.offsets[p + 1]]
@@ -0,0 +1,216 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+from fitness import batch_fitness
+from mutation import MUTATION_RATE, sparse_mutate
+from organism import Organism, TRAITS, INITIAL_TRAIT_RANGES
+from reproduction import crossover
+from rng import get_rng
+
+
+class Population:
+    def __init__(self, traits, fitness=None, patch=None, trait_names=TRAITS):
+        """
+        Structure-of-arrays container for a population of organisms.
+
+        ``traits`` has one row per trait and one column per organism, so each
+        trait is stored contiguously as ``traits[j]``. ``fitness`` and ``patch``
+        (index of the environment patch occupied) are parallel 1-D columns.
+
+        :param traits: Array of shape (num_traits, size).
+        :param fitness: Fitness per organism (optional, defaults to 0).
+        :param patch: Patch index per organism (optional, defaults to -1).
+        :param trait_names: Names of the trait rows, in order.
+        """
+        self.trait_names = tuple(trait_names)
+        self.traits = np.ascontiguousarray(traits, dtype=np.float64).reshape(len(self.trait_names), -1)
+        size = self.traits.shape[1]
+        self.fitness = np.zeros(size) if fitness is None else np.asarray(fitness, dtype=np.float64)
+        self.patch = np.full(size, -1, dtype=np.intp) if patch is None else np.asarray(patch, dtype=np.intp)
+
+    @classmethod
+    def random(cls, size, trait_names=TRAITS, rng=None):
+        """
+        Create a founding population with traits drawn like ``Organism()``.
+
+        :param size: Number of organisms.
+        :param trait_names: Names of the traits to draw.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: A new Population.
+        """
+        rng = get_rng(rng)
+        traits = np.empty((len(trait_names), size))
+        for j, trait in enumerate(trait_names):
+            low, high = INITIAL_TRAIT_RANGES[trait]
+            traits[j] = rng.uniform(low, high, size)
+        return cls(traits, trait_names=trait_names)
+
+    @classmethod
+    def from_organisms(cls, organisms, trait_names=TRAITS):
+        """
+        Pack a list of Organism objects into a Population.
+        """
+        traits = np.array(
+            [[org.genetics[trait] for org in organisms] for trait in trait_names],
+            dtype=np.float64,
+        ).reshape(len(trait_names), len(organisms))
+        fitness = np.array([org.fitness for org in organisms], dtype=np.float64)
+        return cls(traits, fitness=fitness, trait_names=trait_names)
+
+    def to_organisms(self):
+        """
+        Unpack the population into standalone Organism objects.
+        """
+        organisms = []
+        for i in range(len(self)):
+            organism = Organism(genetics={
+                trait: float(self.traits[j, i]) for j, trait in enumerate(self.trait_names)
+            })
+            organism.fitness = float(self.fitness[i])
+            organisms.append(organism)
+        return organisms
+
+    def __len__(self):
+        return self.traits.shape[1]
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("Population index out of range.")
+        return OrganismView(self, index % len(self))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield OrganismView(self, i)
+
+    def trait(self, name):
+        """
+        Return the column holding the given trait.
+        """
+        return self.traits[self.trait_names.index(name)]
+
+    def take(self, index):
+        """
+        Return a new Population made of the organisms at ``index``.
+
+        :param index: Integer index array (may repeat entries) or boolean mask.
+        """
+        return Population(
+            self.traits[:, index],
+            fitness=self.fitness[index],
+            patch=self.patch[index],
+            trait_names=self.trait_names,
+        )
+
+    def reproduce(self, parent_a, parent_b, rng=None):
+        """
+        Create the offspring of many parent pairs in one batch.
+
+        :param parent_a: Index of the first parent of each offspring.
+        :param parent_b: Index of the second parent of each offspring.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: A new Population holding the offspring.
+        """
+        return Population(crossover(self.traits, parent_a, parent_b, rng), trait_names=self.trait_names)
+
+    def move_to_patches(self, environment):
+        """
+        Move every organism for one generation, see ``Environment.disperse``.
+        """
+        self.patch = environment.disperse(self.patch)
+
+    def calculate_fitness(self, environment):
+        """
+        Calculate fitness of every organism against the optimal traits of its patch.
+        """
+        self.fitness = batch_fitness(self.traits, self.patch, environment.optimal_matrix(self.trait_names))
+
+    def mutate(self, mutation_rate=MUTATION_RATE, rng=None):
+        """
+        Apply Gaussian mutations to each trait value with probability ``mutation_rate``.
+
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: Tuple (trait_index, organism_index) of the mutated slots.
+        """
+        return sparse_mutate(self.traits, mutation_rate, rng=rng)
+
+    def trait_means(self):
+        """
+        Return the mean of every trait (0 for an empty population).
+        """
+        if not len(self):
+            return {trait: 0 for trait in self.trait_names}
+        means = self.traits.mean(axis=1)
+        return {trait: float(means[j]) for j, trait in enumerate(self.trait_names)}
+
+    def mean_fitness(self):
+        """
+        Return the mean fitness (0 for an empty population).
+        """
+        return float(self.fitness.mean()) if len(self) else 0.0
+
+    def patch_sizes(self, num_patches):
+        """
+        Return the number of organisms in every patch.
+        """
+        return np.bincount(self.patch, minlength=num_patches)
+
+
+class GeneticsView(MutableMapping):
+    """
+    Dict-like view of one organism's traits inside a Population.
+    """
+    def __init__(self, population, index):
+        self._population = population
+        self._index = index
+
+    def __getitem__(self, trait):
+        try:
+            j = self._population.trait_names.index(trait)
+        except ValueError:
+            raise KeyError(trait) from None
+        return float(self._population.traits[j, self._index])
+
+    def __setitem__(self, trait, value):
+        try:
+            j = self._population.trait_names.index(trait)
+        except ValueError:
+            raise KeyError(trait) from None
+        self._population.traits[j, self._index] = value
+
+    def __delitem__(self, trait):
+        raise TypeError("Traits of a population member cannot be deleted.")
+
+    def __iter__(self):
+        return iter(self._population.trait_names)
+
+    def __len__(self):
+        return len(self._population.trait_names)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class OrganismView(Organism):
+    """
+    Organism backed by one column of a Population.
+
+    Reads and writes of ``genetics`` and ``fitness`` go straight to the
+    population arrays, so the legacy Organism methods keep working.
+    """
+    def __init__(self, population, index):
+        self._population = population
+        self._index = index
+        self.genetics = GeneticsView(population, index)
+        self.environment_patch = None
+
+    @property
+    def fitness(self):
+        return float(self._population.fitness[self._index])
+
+    @fitness.setter
+    def fitness(self, value):
+        self._population.fitness[self._index] = value
+
+    @property
+    def patch_index(self):
+        return int(self._population.patch[self._index])
@@ -0,0 +1,85 @@
+import json
+import sys
+
+# Verbosity levels, from least to most output
+QUIET = 0
+SUMMARY = 1
+GENERATION = 2
+
+TEXT_TEMPLATES = {
+    'start': "Initial Population Size: {population_size} (User Input: {initial_population_size})",
+    'generation': (
+        "Generation {generation}: Viable Population Size = {viable_size}\n"
+        "Generation {generation}: Population Size = {population_size}\n"
+        "- Egg Survival Rate: {egg_survival_rate:.4f}\n"
+        "- Average Fitness: {average_fitness:.4f}"
+    ),
+    'switch': "Generation {generation}: switched to the {engine} engine",
+    'extinct': "Population extinct!",
+    'finish': "Simulation finished after {generation} generations (Population Size = {population_size})",
+}
+
+
+class ProgressLogger:
+    def __init__(self, stream=None, level=GENERATION, interval=1, structured=False, buffer_size=20):
+        """
+        Buffered progress output for simulation runs.
+
+        Records are formatted as readable text or, with ``structured=True``, as
+        one JSON object per line. They are written to ``stream`` in batches of
+        ``buffer_size`` lines and whenever the logger is flushed.
+
+        :param stream: Writable text file handle (defaults to sys.stdout).
+        :param level: Most verbose level that is written (QUIET, SUMMARY or GENERATION).
+        :param interval: Only every ``interval``-th generation is logged.
+        :param structured: Write JSON lines instead of text.
+        :param buffer_size: Number of records to hold before writing.
+        """
+        if interval < 1:
+            raise ValueError("Reporting interval must be at least 1.")
+        self.stream = stream
+        self.level = level
+        self.interval = interval
+        self.structured = structured
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def enabled(self, level):
+        return level <= self.level
+
+    def wants_generation(self, generation):
+        """
+        Whether the given generation will be logged; callers check this before
+        computing any per-generation values.
+        """
+        return self.level >= GENERATION and generation % self.interval == 0
+
+    def log(self, level, event, **fields):
+        """
+        Record an event if its level is enabled.
+
+        :param level: Verbosity level of the event.
+        :param event: Event name, e.g. 'generation'.
+        :param fields: Values describing the event.
+        """
+        if not self.enabled(level):
+            return
+        if self.structured:
+            self._buffer.append(json.dumps({'event': event, **fields}))
+        elif event in TEXT_TEMPLATES:
+            self._buffer.append(TEXT_TEMPLATES[event].format(**fields))
+        else:
+            self._buffer.append(f"{event}: " + ", ".join(f"{key}={value}" for key, value in fields.items()))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write out all buffered records.
+        """
+        if not self._buffer:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("\n".join(self._buffer) + "\n")
+        stream.flush()
+        self._buffer.clear()
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+
+# matplotlib is imported inside the functions that draw, so runs that never
+# plot do not pay its import cost
+
+FIGURE_SIZE = (12, 6)
+REPORT_FORMATS = ('png', 'svg')
+
+
+def normalize_trait_histories(history):
+    """
+    Scale every trait history by its own maximum in one vectorized pass.
+
+    Traits whose maximum is not positive are scaled to 0.
+
+    :param history: History of the run.
+    :return: Array of shape (num_traits, num_generations), rows in trait order.
+    """
+    _, _, trait_averages = history.as_arrays()
+    if not trait_averages.shape[1]:
+        return trait_averages
+    peak = trait_averages.max(axis=1, keepdims=True)
+    positive = peak > 0
+    return np.where(positive, trait_averages / np.where(positive, peak, 1), 0.0)
+
+
+def export_summary(history, path):
+    """
+    Write the per-generation summary of a run as CSV.
+
+    Columns are the generation, population size, average fitness, the average
+    of every trait and its relative value as plotted by the report.
+
+    :param history: History of the run.
+    :param path: Destination file.
+    """
+    population_sizes, average_fitness, trait_averages = history.as_arrays()
+    relative = normalize_trait_histories(history)
+    trait_names = list(history.trait_averages)
+    header = ["generation", "population_size", "average_fitness"]
+    header += trait_names + [f"relative_{trait}" for trait in trait_names]
+    columns = np.column_stack([
+        np.arange(1, len(population_sizes) + 1),
+        population_sizes,
+        average_fitness,
+        trait_averages.T,
+        relative.T,
+    ]) if len(population_sizes) else np.empty((0, len(header)))
+    np.savetxt(path, columns, delimiter=",", header=",".join(header), comments="", fmt="%.10g")
+
+
+def _decorate(ax, ylabel, title):
+    ax.set_xlabel("Generation")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend()
+    ax.grid()
+
+
+def _plot_population_sizes(ax, history):
+    generations = range(len(history.population_sizes))
+    ax.plot(generations, history.population_sizes, label="Population Size", color="blue", linewidth=2)
+    _decorate(ax, "Population Size", "Population Size Over Time")
+
+
+def _plot_trait_evolution(ax, history):
+    # Plot trait averages with relative scaling
+    generations = range(len(history.population_sizes))
+    relative = normalize_trait_histories(history)
+    for j, (trait, averages) in enumerate(history.trait_averages.items()):
+        if any(averages):  # Check if there are non-zero averages
+            ax.plot(
+                generations,
+                relative[j],
+                label=f"Relative {trait.capitalize()}",
+                linewidth=2
+            )
+    _decorate(ax, "Relative Trait Value", "Relative Trait Evolution Over Time")
+
+
+FIGURES = {
+    'population_size': _plot_population_sizes,
+    'trait_evolution': _plot_trait_evolution,
+}
+
+
+def render_report(history, output_dir, formats=('png',), dpi=100):
+    """
+    Render every report figure to image files without a GUI.
+
+    Figures are drawn on plain ``Figure`` objects, which use the
+    non-interactive Agg canvas regardless of the configured pyplot backend.
+
+    :param history: History of the run to plot.
+    :param output_dir: Directory for the files (created if needed).
+    :param formats: File formats to write, any of 'png' and 'svg'.
+    :param dpi: Resolution of raster output.
+    :return: List of the written file paths.
+    """
+    from matplotlib.figure import Figure
+
+    for file_format in formats:
+        if file_format not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {file_format}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, draw in FIGURES.items():
+        figure = Figure(figsize=FIGURE_SIZE)
+        draw(figure.add_subplot(), history)
+        for file_format in formats:
+            path = os.path.join(output_dir, f"{name}.{file_format}")
+            figure.savefig(path, format=file_format, dpi=dpi)
+            paths.append(path)
+    return paths
+
+
+def show_report(history):
+    """
+    Display every report figure in interactive pyplot windows.
+
+    :param history: History of the run to plot.
+    """
+    import matplotlib.pyplot as plt
+
+    for draw in FIGURES.values():
+        figure = plt.figure(figsize=FIGURE_SIZE)
+        draw(figure.add_subplot(), history)
+    plt.show()
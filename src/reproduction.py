@@ -0,0 +1,77 @@
+import numpy as np
+from rng import get_rng
+
+
+def crossover(traits, parent_a, parent_b, rng=None):
+    """
+    Produce the trait matrix of a whole brood of offspring at once.
+
+    Every offspring inherits each trait from parent A or parent B with equal
+    probability, like ``Organism.reproduce``. A random boolean inheritance mask
+    selects the parent per (trait, offspring) slot and the trait values are
+    gathered in a single pass.
+
+    :param traits: Parental trait matrix of shape (num_traits, size).
+    :param parent_a: Index of the first parent of each offspring.
+    :param parent_b: Index of the second parent of each offspring.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Offspring trait matrix of shape (num_traits, len(parent_a)).
+    """
+    parent_a = np.asarray(parent_a, dtype=np.intp)
+    parent_b = np.asarray(parent_b, dtype=np.intp)
+    if parent_a.shape != parent_b.shape:
+        raise ValueError("Parent index arrays must have the same length.")
+
+    inherit_a = get_rng(rng).integers(2, size=(len(traits), len(parent_a)), dtype=bool)
+    parent = np.where(inherit_a, parent_a, parent_b)
+    return traits[np.arange(len(traits))[:, None], parent]
+
+
+def expected_offspring(fitness, egg_count, egg_survival_rate, rng=None):
+    """
+    Draw the brood size of every parent at once.
+
+    Each parent gets ``fitness * egg_count * egg_survival_rate`` scaled by a
+    Gaussian factor centred on ``0.5 + fitness``, truncated to an integer and
+    at least 1.
+
+    :param fitness: Fitness of each parent.
+    :param egg_count: Eggs per reproduction event.
+    :param egg_survival_rate: Egg survival rate, a scalar or one value per parent.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Integer array with the brood size of each parent.
+    """
+    fitness = np.asarray(fitness, dtype=np.float64)
+    return np.maximum(1, (
+        fitness * egg_count * egg_survival_rate * get_rng(rng).normal(0.5 + fitness, 0.2)
+    ).astype(np.int64))
+
+
+def allocate_offspring_by_patch(counts, patch_index, patch_capacity, rng=None):
+    """
+    Cap the offspring of every patch at that patch's carrying capacity.
+
+    Recruitment is density dependent per patch: crowding in one patch only
+    limits the offspring of that patch. Patches whose broods fit are left
+    unchanged. Every other patch keeps exactly its capacity with one
+    multivariate hypergeometric draw over its members, i.e. a uniform sample
+    without replacement from the patch's offspring, so no parent is favoured
+    by its position and none exceeds its own brood size.
+
+    :param counts: Brood size of each parent.
+    :param patch_index: PatchIndex of the parents.
+    :param patch_capacity: Maximum number of offspring per patch.
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Integer array with the number of surviving offspring per parent.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    totals = np.bincount(patch_index.patch, weights=counts, minlength=patch_index.num_patches)
+    crowded = np.flatnonzero(totals > patch_capacity)
+    if not len(crowded):
+        return counts
+    counts = counts.copy()
+    rng = get_rng(rng)
+    for p in crowded:
+        members = patch_index.members(p)
+        counts[members] = rng.multivariate_hypergeometric(counts[members], patch_capacity[p], method='marginals')
+    return counts
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Process-wide generator used when no generator is passed explicitly
+_default_rng = None
+
+
+def get_rng(rng=None):
+    """
+    Return ``rng`` itself, or the process-wide default generator if it is None.
+
+    :param rng: A numpy.random.Generator or None.
+    """
+    global _default_rng
+    if rng is not None:
+        return rng
+    if _default_rng is None:
+        _default_rng = np.random.default_rng()
+    return _default_rng
+
+
+def make_rng(seed=None):
+    """
+    Create an independent generator.
+
+    :param seed: Integer seed, SeedSequence, existing Generator (returned as is)
+                 or None for fresh entropy.
+    :return: A numpy.random.Generator.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_rngs(seed, count):
+    """
+    Create ``count`` statistically independent child generators.
+
+    Children are derived with ``SeedSequence.spawn``, so the same seed always
+    yields the same streams.
+
+    :param seed: Integer seed, SeedSequence or None for fresh entropy.
+    :param count: Number of child generators.
+    :return: List of numpy.random.Generator.
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(count)]
+
+
+def rng_state(rng):
+    """
+    Return the state of a generator as a JSON-serializable dictionary.
+    """
+    return rng.bit_generator.state
+
+
+def rng_from_state(state):
+    """
+    Recreate a generator from a state returned by ``rng_state``.
+    """
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
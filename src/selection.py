@@ -0,0 +1,196 @@
+import numpy as np
+from rng import get_rng
+
+
+def _segments(n, offsets):
+    if offsets is None:
+        return np.array([0, n])
+    offsets = np.asarray(offsets, dtype=np.intp)
+    if offsets[0] != 0 or offsets[-1] != n:
+        raise ValueError("Segment offsets must start at 0 and end at the number of weights.")
+    return offsets
+
+
+class CumulativeSampler:
+    def __init__(self, weights, offsets=None):
+        """
+        Fitness-proportional sampler built once per generation.
+
+        The cumulative sum of the weights is computed in O(N); each draw is a
+        binary search into it, so k draws cost O(k log N).
+
+        Weights may be split into contiguous segments (e.g. the organisms of
+        each patch, see PatchIndex) so that every draw stays inside a chosen
+        segment. A segment whose weights are all zero is sampled uniformly.
+
+        :param weights: Non-negative weight per individual (negative values count as 0).
+        :param offsets: Segment boundaries; segment s is ``offsets[s]:offsets[s + 1]``
+                        (optional, defaults to a single segment).
+        """
+        weights = np.clip(np.asarray(weights, dtype=np.float64), 0, None)
+        if not len(weights):
+            raise ValueError("Cannot sample from an empty population.")
+        self.offsets = _segments(len(weights), offsets)
+        self.cumulative = np.cumsum(weights)
+        bounds = np.concatenate(([0.0], self.cumulative))[self.offsets]
+        self.segment_start = bounds[:-1]
+        self.segment_total = np.diff(bounds)
+
+    def sample(self, k, rng=None, segment=None):
+        """
+        Draw ``k`` indices with probability proportional to their weight.
+
+        :param k: Number of indices to draw.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :param segment: Segment to draw from for each of the k draws (optional,
+                        defaults to segment 0).
+        :return: Integer array of length k.
+        """
+        segment = np.zeros(k, dtype=np.intp) if segment is None else np.asarray(segment, dtype=np.intp)
+        first = self.offsets[segment]
+        size = self.offsets[segment + 1] - first
+        if np.any(size == 0):
+            raise ValueError("Cannot draw from an empty segment.")
+
+        u = get_rng(rng).random(k)
+        total = self.segment_total[segment]
+        index = np.searchsorted(self.cumulative, self.segment_start[segment] + u * total, side='right')
+        # Segments without weight are sampled uniformly
+        index = np.where(total > 0, index, first + (u * size).astype(np.intp))
+        # Rounding can push a target onto the segment end; clamp into the segment
+        return np.clip(index, first, first + size - 1)
+
+
+# Bulk pairing rounds of AliasTable before falling back to sequential pairing
+ALIAS_ROUNDS = 32
+
+
+class AliasTable:
+    def __init__(self, weights, offsets=None):
+        """
+        Walker/Vose alias table for fitness-proportional sampling.
+
+        Construction is O(N) and every draw is O(1), which pays off when the
+        number of draws per generation is much larger than log N. With
+        ``offsets`` a separate table is built for every segment, as in
+        CumulativeSampler.
+
+        :param weights: Non-negative weight per individual (negative values count as 0).
+        :param offsets: Segment boundaries (optional, defaults to a single segment).
+        """
+        weights = np.clip(np.asarray(weights, dtype=np.float64), 0, None)
+        if not len(weights):
+            raise ValueError("Cannot sample from an empty population.")
+        self.offsets = _segments(len(weights), offsets)
+        self.probability = np.ones(len(weights))
+        self.alias = np.arange(len(weights))
+        self._build(weights)
+
+    def _build(self, weights):
+        sizes = np.diff(self.offsets)
+        segment = np.repeat(np.arange(len(sizes)), sizes)
+        # Pairwise sums per segment (reduceat) rather than a sequential bincount:
+        # the last column paired absorbs the rounding error of the total
+        total = np.where(sizes > 0, np.add.reduceat(weights, np.minimum(self.offsets[:-1], len(weights) - 1)), 0.0)
+        # Segments without weight keep probability 1 everywhere: uniform within the segment
+        scale = np.divide(sizes, total, out=np.zeros(len(sizes)), where=total > 0)
+        value = weights * scale[segment]
+        active = total[segment] > 0
+        small = np.flatnonzero(active & (value < 1))
+        large = np.flatnonzero(active & (value > 1))
+
+        # Vose's algorithm in bulk: every round pairs all small columns with
+        # large donors of their segment by matching cumulative deficits against
+        # cumulative surpluses. Donors pushed below 1 are small in the next round.
+        for _ in range(ALIAS_ROUNDS):
+            if not len(small) or not len(large):
+                break
+            deficit = 1 - value[small]
+            surplus = value[large] - 1
+            deficit_before = np.cumsum(deficit) - deficit
+            surplus_after = np.cumsum(surplus)
+            small_segment = segment[small]
+            segments = np.arange(len(sizes) + 1)
+            small_start = np.searchsorted(small_segment, segments)
+            large_start = np.searchsorted(segment[large], segments)
+            first_donor = large_start[small_segment]
+            end_donor = large_start[small_segment + 1]
+            has_donor = end_donor > first_donor
+
+            # Deficit before each small column within its segment, offset to the
+            # surplus scale at the segment's first donor
+            surplus_before = np.concatenate((surplus_after - surplus, [0.0]))
+            offset = surplus_before[large_start] - deficit_before[np.minimum(small_start, len(small) - 1)]
+            target = deficit_before + offset[small_segment]
+            donor = np.clip(np.searchsorted(surplus_after, target, side='right'), first_donor, end_donor - 1)
+
+            # Small columns without a donor in their segment are 1 up to rounding
+            # error and keep probability 1
+            served = small[has_donor]
+            self.probability[served] = value[served]
+            self.alias[served] = large[donor[has_donor]]
+            remaining = np.maximum(
+                surplus + 1 - np.bincount(donor[has_donor], weights=deficit[has_donor], minlength=len(large)), 0
+            )
+            value[large] = remaining
+            small = large[remaining < 1]
+            large = large[remaining > 1]
+
+        self._finish(value, list(small), list(large))
+
+    def _finish(self, value, small, large):
+        # Sequential Vose pairing for what is left after the bulk rounds
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            self.probability[s] = value[s]
+            self.alias[s] = l
+            value[l] -= 1 - value[s]
+            if value[l] < 1:
+                small.append(large.pop())
+        # Leftovers are exactly 1 up to rounding error and keep probability 1
+
+    def sample(self, k, rng=None, segment=None):
+        """
+        Draw ``k`` indices with probability proportional to their weight.
+
+        :param k: Number of indices to draw.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :param segment: Segment to draw from for each of the k draws (optional,
+                        defaults to segment 0).
+        :return: Integer array of length k.
+        """
+        segment = np.zeros(k, dtype=np.intp) if segment is None else np.asarray(segment, dtype=np.intp)
+        first = self.offsets[segment]
+        size = self.offsets[segment + 1] - first
+        if np.any(size == 0):
+            raise ValueError("Cannot draw from an empty segment.")
+
+        rng = get_rng(rng)
+        column = np.minimum(first + (rng.random(k) * size).astype(np.intp), first + size - 1)
+        keep = rng.random(k) < self.probability[column]
+        return np.where(keep, column, self.alias[column])
+
+
+SAMPLERS = {
+    'cumulative': CumulativeSampler,
+    'alias': AliasTable,
+}
+
+
+def select_local_mates(fitness, patch_index, focal, method='cumulative', rng=None):
+    """
+    Draw a fitness-weighted mate from the same patch as every focal parent.
+
+    :param fitness: Fitness of the candidate mates.
+    :param patch_index: PatchIndex of the candidate mates.
+    :param focal: Index of the focal parent of each offspring.
+    :param method: 'cumulative' (binary search) or 'alias' (alias table).
+    :param rng: numpy.random.Generator to draw from (optional).
+    :return: Integer array with one mate index (into ``fitness``) per focal parent.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown selection method: {method}")
+    order = patch_index.order
+    sampler = SAMPLERS[method](np.asarray(fitness)[order], offsets=patch_index.offsets)
+    return order[sampler.sample(len(focal), rng, segment=patch_index.patch[focal])]
@@ -1,136 +1,302 @@
-import numpy as np
-import random
+from aggregate import GenotypeCounts, adapt_representation, aggregate_generation
+from alleles import encode_population
+from batched import simulate_batched
+from checkpoint import load_checkpoint, save_checkpoint
+from config import simulation_params
 from environment import Environment
-from organism import Organism
-from evolution import update_optimal_traits
-import matplotlib.pyplot as plt
+from generation import individual_generation
+from history import History
+from metrics import MetricRegistry
+from population import Population
+from progress import GENERATION, SUMMARY, ProgressLogger
+from rng import make_rng
+import reporting
+from evolution import LogisticLookup, update_optimal_traits_batch
+from state import GenerationRecord, SimulationState
+from topology import CaveNetwork
 
-def run_simulation(
+def iter_simulation(
     num_decades,
     initial_population_size,
     preset_name,
     num_patches=1,
     fitness_threshold=0.5,
     egg_count=50,
-    carrying_capacity=1000
+    carrying_capacity=1000,
+    **params
 ):
-    mutation_rate = 5.97e-9
-    num_generations = num_decades * 10  # 10 generations per decade
-    environment = Environment(num_patches=num_patches, preset=Environment.cave_presets(preset_name))
-    population = [Organism() for _ in range(initial_population_size)]
+    """
+    Run the simulation lazily, yielding one GenerationRecord per generation.
 
-    population_sizes = []
-    trait_averages = {"pigmentation": [], "eye_size": [], "metabolic_rate": []}
+    Nothing is accumulated between generations, so callers can stream results,
+    aggregate them on the fly or stop early. The generator ends after the last
+    generation or as soon as the population goes extinct.
 
-# Ensure correct initial population size
-    population = [Organism() for _ in range(initial_population_size)]
+    Takes the same parameters as ``run_simulation``.
+    """
+    state = _initial_state(simulation_params(
+        num_decades=num_decades,
+        initial_population_size=initial_population_size,
+        preset_name=preset_name,
+        num_patches=num_patches,
+        fitness_threshold=fitness_threshold,
+        egg_count=egg_count,
+        carrying_capacity=carrying_capacity,
+        **params
+    ))
+    yield from _generations(state)
 
-    # Debugging the initial setup
-    print(f"Initial Population Size: {len(population)} (User Input: {initial_population_size})")
 
-    for generation in range(1, num_generations + 1):
-        environment.change_conditions()
-        for patch in environment.patches:
-            update_optimal_traits(patch)
-
-        for organism in population:
-            organism.move_to_patch(environment)
-
-        for organism in population:
-            organism.calculate_fitness(organism.environment_patch)
-
-        # Filter viable population based on fitness
-        viable_population = [org for org in population if org.fitness >= (fitness_threshold+random.uniform(-0.1, 0.1))]
-        
-        if not viable_population:
-            print("Population extinct!")
-            break
-
-        # Debugging viable population
-        print(f"Generation {generation}: Viable Population Size = {len(viable_population)}")
-
-        # Calculate density-dependent survival rate with a minimum threshold
-        egg_survival_rate = (1+organism.environment_patch.get("food_availability"))**2/(egg_count)
-
-        # Generate offspring based on fitness and survival rate
-        offspring_population = []
-        for organism in viable_population:
-            num_offspring = max(1, int((organism.fitness * egg_count * egg_survival_rate) * random.gauss(0.5+organism.fitness, 0.2)))
-            for _ in range(num_offspring):
-                if len(offspring_population) < carrying_capacity:
-                    parents = random.choices(
-                        viable_population,
-                        weights=[org.fitness for org in viable_population],
-                        k=1
-                    )
-                    offspring = Organism.reproduce(parents[0], organism)
-                    offspring.mutate(mutation_rate)
-                    offspring.move_to_patch(environment)
-                    offspring.calculate_fitness(offspring.environment_patch)
-                    offspring_population.append(offspring)
-
-        population = offspring_population
-
-        # Debugging population size at the end of the generation
-        print(f"Generation {generation}: Population Size = {len(population)}")
-        print(f"- Egg Survival Rate: {egg_survival_rate:.4f}")
-        print(f"- Average Fitness: {np.mean([org.fitness for org in population]) if population else 0:.4f}")
-
-        population_sizes.append(len(population))
-
-        for trait in trait_averages:
-            avg_trait = (
-                np.mean([org.genetics[trait] for org in population]) if population else 0
+def simulate(
+    num_decades,
+    initial_population_size,
+    preset_name,
+    num_patches=1,
+    fitness_threshold=0.5,
+    egg_count=50,
+    carrying_capacity=1000,
+    *,
+    logger=None,
+    checkpoint_path=None,
+    checkpoint_every=100,
+    metrics=None,
+    snapshots=None,
+    **params
+):
+    """
+    Run the simulation without plotting and return its History.
+
+    Takes the same parameters as ``run_simulation``. Progress goes to
+    ``logger``, a ProgressLogger (defaults to per-generation text on
+    standard output). When ``checkpoint_path`` is
+    given, the full state is saved there every ``checkpoint_every``
+    generations and at the end of the run (see ``resume_simulation``).
+    Every generation is passed to ``metrics``, a MetricRegistry (defaults
+    to one with just the metrics the History is recorded from), and to
+    ``snapshots``, a SnapshotWriter, if given.
+    """
+    state = _initial_state(simulation_params(
+        num_decades=num_decades,
+        initial_population_size=initial_population_size,
+        preset_name=preset_name,
+        num_patches=num_patches,
+        fitness_threshold=fitness_threshold,
+        egg_count=egg_count,
+        carrying_capacity=carrying_capacity,
+        **params
+    ))
+
+    logger = logger if logger is not None else ProgressLogger()
+    logger.log(SUMMARY, 'start', population_size=len(state.population), initial_population_size=initial_population_size)
+    return _run(state, logger, checkpoint_path, checkpoint_every, metrics, snapshots)
+
+
+def resume_simulation(checkpoint_path, logger=None, checkpoint_every=100, metrics=None, snapshots=None):
+    """
+    Continue a run from a checkpoint written by ``simulate``.
+
+    The random number generators are restored along with the state, so the
+    resumed run is identical to one that was never interrupted.
+
+    :param checkpoint_path: Checkpoint file; it keeps being updated as the run continues.
+    :param logger: ProgressLogger for progress output (optional).
+    :param checkpoint_every: Number of generations between checkpoints.
+    :param metrics: MetricRegistry to evaluate on the remaining generations (optional);
+                    the History is only continued from one that records it.
+    :param snapshots: SnapshotWriter for the remaining generations (optional).
+    :return: The History of the whole run.
+    """
+    state = load_checkpoint(checkpoint_path)
+    logger = logger if logger is not None else ProgressLogger()
+    return _run(state, logger, checkpoint_path, checkpoint_every, metrics, snapshots)
+
+
+def _initial_state(params):
+    # The seed only builds the generator; the checkpointed generator state supersedes it
+    rng = make_rng(params.pop('seed'))
+    num_patches = params['num_patches']
+    network = CaveNetwork.build(params['topology'], num_patches, params['dispersal_rate']) if params['topology'] else None
+    environment = Environment(num_patches=num_patches, preset=Environment.cave_presets(params['preset_name']), rng=rng, network=network)
+    population = encode_population(Population.random(params['initial_population_size'], rng=rng), params['genetics'])
+    if params['engine'] == 'aggregate':
+        population = GenotypeCounts.from_population(population)
+    return SimulationState(params, environment, population, History(population.trait_names), rng)
+
+
+def _run(state, logger, checkpoint_path, checkpoint_every, metrics=None, snapshots=None):
+    history = state.history
+    metrics = metrics if metrics is not None else MetricRegistry()
+    aggregated = isinstance(state.population, GenotypeCounts)
+    for record in _generations(state):
+        values = metrics.observe(record)
+        history.observe(values)
+        if snapshots is not None:
+            snapshots.observe(record)
+
+        if (record.counts is not None) != aggregated:
+            aggregated = not aggregated
+            logger.log(SUMMARY, 'switch', generation=record.generation, engine='aggregate' if aggregated else 'individual')
+
+        if logger.wants_generation(record.generation):
+            average_fitness = values['average_fitness'] if 'average_fitness' in values else record.population.mean_fitness()
+            logger.log(
+                GENERATION,
+                'generation',
+                generation=record.generation,
+                viable_size=record.viable_size,
+                population_size=record.population_size,
+                egg_survival_rate=float(record.egg_survival_rate),
+                average_fitness=float(average_fitness),
             )
-            trait_averages[trait].append(avg_trait)
-
-    # Plot population size
-    plt.figure(figsize=(12, 6))
-    generations = range(len(population_sizes))
-    plt.plot(generations, population_sizes, label="Population Size", color="blue", linewidth=2)
-    _extracted_from_run_simulation_70(
-        "Population Size", "Population Size Over Time"
-    )
-    # Plot trait averages with relative scaling
-    plt.figure(figsize=(12, 6))
-    for trait, averages in trait_averages.items():
-        if any(averages):  # Check if there are non-zero averages
-            scaled_averages = [
-                avg / max(averages) if max(averages) > 0 else 0 for avg in averages
-            ]
-            plt.plot(
-                generations,
-                scaled_averages,
-                label=f"Relative {trait.capitalize()}",
-                linewidth=2
+
+        if checkpoint_path and record.generation % checkpoint_every == 0 and not state.finished:
+            save_checkpoint(checkpoint_path, state)
+
+    if state.extinct:
+        logger.log(SUMMARY, 'extinct', generation=state.generation + 1)
+    else:
+        logger.log(SUMMARY, 'finish', generation=state.generation, population_size=len(state.population))
+    logger.flush()
+    if snapshots is not None:
+        snapshots.flush()
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, state)
+    return history
+
+
+def _generations(state):
+    params = state.params
+    environment = state.environment
+    rng = state.rng
+    # Quantize light to a precomputed response table when requested
+    light_lookup = LogisticLookup(params['light_levels']) if params['light_levels'] else None
+
+    while not state.finished:
+        environment.change_conditions()
+        update_optimal_traits_batch(environment, lookup=light_lookup)
+
+        step = aggregate_generation if isinstance(state.population, GenotypeCounts) else individual_generation
+        result = step(state.population, environment, params, rng)
+        if result is None:
+            state.extinct = True
+            return
+
+        offspring_population, viable_size, egg_survival_rate = result
+        if params.get('engine') == 'hybrid':
+            offspring_population = adapt_representation(
+                offspring_population, params['aggregate_threshold'], params['genetics']
             )
-    _extracted_from_run_simulation_70(
-        "Relative Trait Value", "Relative Trait Evolution Over Time"
-    )
+        state.population = offspring_population
+        state.generation += 1
+        yield GenerationRecord(
+            state.generation,
+            offspring_population,
+            viable_size,
+            egg_survival_rate,
+            offspring_population.patch_sizes(environment.num_patches),
+        )
+
+
+def run_simulation(
+    num_decades,
+    initial_population_size,
+    preset_name,
+    num_patches=1,
+    fitness_threshold=0.5,
+    egg_count=50,
+    carrying_capacity=1000,
+    *,
+    num_replicates=None,
+    plot=True,
+    report_dir=None,
+    report_formats=('png',),
+    logger=None,
+    metrics=None,
+    snapshots=None,
+    **params
+):
+    """
+    Run the simulation and plot its results.
 
+    Simulation parameters after ``carrying_capacity`` are keyword-only;
+    every entry of ``config.SCHEMA`` not given takes its default there.
 
-# TODO Rename this here and in `run_simulation`
-def _extracted_from_run_simulation_70(arg0, arg1):
-    plt.xlabel("Generation")
-    plt.ylabel(arg0)
-    plt.title(arg1)
-    plt.legend()
-    plt.grid()
-    plt.show()
+    :param carrying_capacity: Maximum number of offspring per generation. It is
+                              split evenly over the patches and every patch
+                              caps its own offspring (see ``Environment.patch_capacity``).
+    :param topology: Connect the patches as a cave network ('chain', 'ring', 'grid'
+                     or 'complete') instead of moving organisms to random patches.
+    :param dispersal_rate: Probability of leaving a patch per generation in a cave network.
+    :param genetics: Trait representation: 'dense' stores every trait value,
+                     'alleles' stores small integer codes into per-trait allele
+                     tables (see ``AllelePopulation``). Both give identical runs.
+    :param engine: 'individual' tracks every organism; 'aggregate' tracks classes
+                   of identical organisms with their counts (see ``GenotypeCounts``),
+                   so the cost follows the number of genotypes, not the census size;
+                   'hybrid' switches between the two every generation as genotype
+                   diversity changes (see ``adapt_representation``).
+    :param aggregate_threshold: With the hybrid engine, group organisms into classes
+                                once there are fewer than this many classes per organism.
+    :param seed: Seed of the run's random number generator (integer, SeedSequence,
+                 Generator, or None for fresh entropy).
+    :param num_replicates: Run this many replicates together with the batched
+                           engine (see ``simulate_batched``); ``preset_name`` may
+                           then also be a list of presets. The figures show the
+                           first replicate.
+    :param plot: Show the result figures in interactive windows.
+    :param report_dir: Directory to render the figures into as files instead,
+                       without a GUI (optional).
+    :param report_formats: File formats for ``report_dir``, any of 'png' and 'svg'.
+    :param logger: ProgressLogger for progress output (optional, not available
+                   with ``num_replicates``).
+    :param metrics: MetricRegistry evaluated every generation (optional, not
+                    available with ``num_replicates``). The History is recorded
+                    from its history metrics; ``MetricRegistry(history=False)``
+                    turns recording off.
+    :param snapshots: SnapshotWriter receiving every generation (optional, not
+                      available with ``num_replicates``).
+    :return: The History of the run, or an EnsembleResult with ``num_replicates``.
+    """
+    if num_replicates is not None:
+        if logger is not None or metrics is not None or snapshots is not None:
+            raise ValueError("Progress logging, metrics and snapshots are not available with the batched replicate engine.")
+        result = simulate_batched(
+            num_replicates,
+            num_decades,
+            initial_population_size,
+            preset_name,
+            num_patches,
+            fitness_threshold,
+            egg_count,
+            carrying_capacity,
+            **params
+        )
+        _report(result.histories[0], plot, report_dir, report_formats)
+        return result
 
-if __name__ == "__main__":
-    num_decades = int(input("Enter simulation runtime in decades: "))
-    initial_population_size = int(input("Enter initial population size: "))
-    preset_name = input("Enter cave preset (default_cave, rich_cave, harsh_cave): ")
-    fitness_threshold = float(input("Enter minimum fitness threshold (e.g., 0.2): "))
-    egg_count = int(input("Enter egg count per reproduction event (e.g., 3000 for Astyanax mexicanus, 50 for mammoth cave fish): "))
-    carrying_capacity = int(input("Enter carrying capacity (e.g., 1000): "))
-    run_simulation(
+    history = simulate(
         num_decades,
         initial_population_size,
         preset_name,
-        num_patches=1,
-        fitness_threshold=fitness_threshold,
-        egg_count=egg_count,
-        carrying_capacity=carrying_capacity
+        num_patches,
+        fitness_threshold,
+        egg_count,
+        carrying_capacity,
+        logger=logger,
+        metrics=metrics,
+        snapshots=snapshots,
+        **params
     )
+    _report(history, plot, report_dir, report_formats)
+    return history
+
+
+def _report(history, plot, report_dir, report_formats):
+    if report_dir is not None:
+        reporting.render_report(history, report_dir, formats=report_formats)
+    elif plot:
+        reporting.show_report(history)
+
+if __name__ == "__main__":
+    from cli import main
+    main()
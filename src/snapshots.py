@@ -0,0 +1,232 @@
+import json
+import os
+
+import numpy as np
+from organism import TRAITS
+
+SNAPSHOT_VERSION = 1
+# Rows (organisms or genotype classes) per chunk file
+CHUNK_SIZE = 1 << 20
+
+# Column name -> (dtype, whether it holds one row per trait)
+COLUMNS = {
+    'traits': (np.float64, True),
+    'fitness': (np.float64, False),
+    'patch': (np.int64, False),
+    'count': (np.int64, False),
+}
+
+
+def _chunk_path(directory, column, chunk):
+    return os.path.join(directory, f"{column}_{chunk:05d}.npy")
+
+
+class SnapshotWriter:
+    def __init__(self, directory, trait_names=TRAITS, every=1, generations=None, chunk_size=CHUNK_SIZE):
+        """
+        Append-only on-disk store of full-population snapshots.
+
+        Columns are written into preallocated ``.npy`` chunk files through
+        ``np.memmap``: trait chunks have shape (num_traits, rows), the others
+        (rows,). A snapshot occupies a contiguous row range of one chunk and is
+        listed in ``index.jsonl``, one JSON line per snapshot appended once its
+        rows are written. Writing is a copy into the page cache; nothing is
+        synced until ``flush``. Opening an existing store continues it.
+
+        ``count`` holds the number of organisms each row stands for (1 except
+        for snapshots of the aggregate engine).
+
+        :param directory: Store directory (created if missing).
+        :param trait_names: Names of the trait rows.
+        :param every: With ``observe``, take a snapshot every ``every``-th generation.
+        :param generations: With ``observe``, only take snapshots of these generations (optional).
+        :param chunk_size: Rows per chunk file; larger snapshots get a chunk of their own size.
+        """
+        self.directory = directory
+        self.every = every
+        self.generations = None if generations is None else set(generations)
+        os.makedirs(directory, exist_ok=True)
+
+        metadata_path = os.path.join(directory, 'store.json')
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as handle:
+                metadata = json.load(handle)
+            if metadata['version'] != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot store version: {metadata['version']}")
+            self.trait_names = tuple(metadata['trait_names'])
+            self.chunk_size = metadata['chunk_size']
+        else:
+            self.trait_names = tuple(trait_names)
+            self.chunk_size = chunk_size
+            with open(metadata_path, 'w') as handle:
+                json.dump({'version': SNAPSHOT_VERSION, 'trait_names': list(self.trait_names), 'chunk_size': chunk_size}, handle)
+
+        entries = _read_index(directory)
+        self._chunk = -1
+        self._end = 0
+        self._capacity = 0
+        self._arrays = None
+        if entries:
+            last = entries[-1]
+            self._open_chunk(last['chunk'], mode='r+')
+            self._end = last['start'] + last['size']
+        self._index = open(os.path.join(directory, 'index.jsonl'), 'a')
+
+    def append(self, generation, traits, fitness, patch, count=None):
+        """
+        Write one snapshot.
+
+        :param generation: Generation number the snapshot belongs to.
+        :param traits: Trait matrix of shape (num_traits, size).
+        :param fitness: Fitness per row.
+        :param patch: Patch index per row.
+        :param count: Organisms per row (optional, defaults to 1).
+        """
+        size = len(fitness)
+        if self._end + size > self._capacity:
+            self._new_chunk(max(self.chunk_size, size))
+        rows = slice(self._end, self._end + size)
+        self._arrays['traits'][:, rows] = traits
+        self._arrays['fitness'][rows] = fitness
+        self._arrays['patch'][rows] = patch
+        self._arrays['count'][rows] = 1 if count is None else count
+
+        entry = {'generation': int(generation), 'chunk': self._chunk, 'start': self._end, 'size': size}
+        self._index.write(json.dumps(entry) + '\n')
+        self._index.flush()
+        self._end += size
+
+    def observe(self, record):
+        """
+        Write a snapshot of a GenerationRecord if its generation is selected.
+        """
+        generation = record.generation
+        selected = generation in self.generations if self.generations is not None else generation % self.every == 0
+        if selected:
+            self.append(generation, record.traits, record.fitness, record.patch, record.counts)
+
+    def flush(self):
+        """
+        Write all snapshots through to disk.
+        """
+        if self._arrays is not None:
+            for array in self._arrays.values():
+                array.flush()
+        self._index.flush()
+        os.fsync(self._index.fileno())
+
+    def close(self):
+        self.flush()
+        self._arrays = None
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_chunk(self, capacity):
+        if self._arrays is not None:
+            for array in self._arrays.values():
+                array.flush()
+        chunk = self._chunk + 1
+        for column, (dtype, per_trait) in COLUMNS.items():
+            shape = (len(self.trait_names), capacity) if per_trait else (capacity,)
+            np.lib.format.open_memmap(_chunk_path(self.directory, column, chunk), mode='w+', dtype=dtype, shape=shape)
+        self._open_chunk(chunk, mode='r+')
+        self._end = 0
+
+    def _open_chunk(self, chunk, mode):
+        self._arrays = {
+            column: np.load(_chunk_path(self.directory, column, chunk), mmap_mode=mode) for column in COLUMNS
+        }
+        self._chunk = chunk
+        self._capacity = len(self._arrays['fitness'])
+
+
+class Snapshot:
+    def __init__(self, generation, trait_names, traits, fitness, patch, count):
+        """
+        One stored generation; all columns are read-only memory-mapped views.
+        """
+        self.generation = generation
+        self.trait_names = trait_names
+        self.traits = traits
+        self.fitness = fitness
+        self.patch = patch
+        self.count = count
+
+    def __len__(self):
+        return len(self.fitness)
+
+    def trait(self, name):
+        """
+        Return the column holding the given trait.
+        """
+        return self.traits[self.trait_names.index(name)]
+
+
+class SnapshotStore:
+    def __init__(self, directory):
+        """
+        Read access to a store written by ``SnapshotWriter``.
+
+        Chunk files are memory-mapped read-only on first use, so loading a
+        snapshot copies nothing. A generation written more than once (e.g.
+        after resuming from an earlier checkpoint) resolves to its last
+        snapshot.
+
+        :param directory: Store directory.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'store.json')) as handle:
+            metadata = json.load(handle)
+        if metadata['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot store version: {metadata['version']}")
+        self.trait_names = tuple(metadata['trait_names'])
+        self._entries = {entry['generation']: entry for entry in _read_index(directory)}
+        self._chunks = {}
+
+    @property
+    def generations(self):
+        return sorted(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, generation):
+        return generation in self._entries
+
+    def __getitem__(self, generation):
+        try:
+            entry = self._entries[generation]
+        except KeyError:
+            raise KeyError(f"No snapshot of generation {generation}") from None
+        if entry['chunk'] not in self._chunks:
+            self._chunks[entry['chunk']] = {
+                column: np.load(_chunk_path(self.directory, column, entry['chunk']), mmap_mode='r') for column in COLUMNS
+            }
+        arrays = self._chunks[entry['chunk']]
+        rows = slice(entry['start'], entry['start'] + entry['size'])
+        return Snapshot(
+            generation, self.trait_names,
+            arrays['traits'][:, rows], arrays['fitness'][rows], arrays['patch'][rows], arrays['count'][rows],
+        )
+
+    def __iter__(self):
+        for generation in self.generations:
+            yield self[generation]
+
+
+def _read_index(directory):
+    path = os.path.join(directory, 'index.jsonl')
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path) as handle:
+        for line in handle:
+            # A line cut short by an interrupted run has no complete snapshot behind it
+            if line.endswith('\n'):
+                entries.append(json.loads(line))
+    return entries
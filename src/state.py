@@ -0,0 +1,77 @@
+from streaming import COMPRESSION, population_statistics
+
+
+class SimulationState:
+    def __init__(self, params, environment, population, history, rng, generation=0, extinct=False):
+        """
+        Everything needed to continue a simulation run from a generation boundary.
+
+        :param params: Keyword arguments the run was started with (without output options).
+        :param environment: The Environment.
+        :param population: The Population at the end of ``generation``.
+        :param history: The History recorded so far.
+        :param rng: numpy.random.Generator driving the run (shared with the environment).
+        :param generation: Number of completed generations.
+        :param extinct: Whether the population has gone extinct.
+        """
+        self.params = params
+        self.environment = environment
+        self.population = population
+        self.history = history
+        self.rng = rng
+        self.generation = generation
+        self.extinct = extinct
+
+    @property
+    def num_generations(self):
+        return self.params['num_decades'] * 10  # 10 generations per decade
+
+    @property
+    def finished(self):
+        return self.extinct or self.generation >= self.num_generations
+
+
+class GenerationRecord:
+    def __init__(self, generation, population, viable_size, egg_survival_rate, patch_sizes):
+        """
+        Lightweight summary of one completed generation.
+
+        ``traits``, ``fitness`` and ``patch`` are read-only views of the
+        population arrays of that generation; copy them to keep modified data.
+        ``traits`` is only materialized when accessed. With the aggregate
+        engine every column is a class of ``counts`` identical organisms;
+        ``counts`` is None for individual-based populations. ``population``
+        is the population itself and must not be modified.
+
+        :param generation: Generation number, starting at 1.
+        :param population: The Population at the end of the generation.
+        :param viable_size: Number of organisms that passed the fitness threshold.
+        :param egg_survival_rate: Mean egg survival rate of the viable parents.
+        :param patch_sizes: Number of organisms in each patch at the end of the generation.
+        """
+        self.generation = generation
+        self.trait_names = population.trait_names
+        self.population_size = len(population)
+        self.viable_size = viable_size
+        self.egg_survival_rate = egg_survival_rate
+        self.patch_sizes = _read_only(patch_sizes)
+        self.fitness = _read_only(population.fitness)
+        self.patch = _read_only(population.patch)
+        self.counts = _read_only(population.count) if hasattr(population, 'count') else None
+        self.population = population
+
+    @property
+    def traits(self):
+        return _read_only(self.population.traits)
+
+    def statistics(self, compression=COMPRESSION):
+        """
+        Per-patch summary of fitness and traits, see ``population_statistics``.
+        """
+        return population_statistics(self.population, len(self.patch_sizes), compression)
+
+
+def _read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
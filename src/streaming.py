@@ -0,0 +1,240 @@
+import numpy as np
+
+# Default t-digest compression; a cell keeps about compression / 2 centroids
+COMPRESSION = 200
+
+
+class StreamingStatistics:
+    def __init__(self, names, num_groups=1, compression=COMPRESSION):
+        """
+        Mergeable one-pass summary of several value columns split into groups.
+
+        For every (column, group) cell it keeps the count, mean and variance
+        (Welford/Chan updates), the minimum and maximum and, unless
+        ``compression`` is None, a t-digest of the distribution for approximate
+        quantiles. Batches are folded in with ``update`` and summaries of
+        disjoint data (other replicates, other worker processes) with
+        ``merge``; state is a handful of small arrays, so summaries pickle
+        cheaply.
+
+        :param names: Names of the value columns, e.g. ('fitness',) + TRAITS.
+        :param num_groups: Number of groups, e.g. patches or replicates.
+        :param compression: t-digest compression, or None to skip quantiles.
+        """
+        self.names = tuple(names)
+        self.num_groups = num_groups
+        self.compression = compression
+        num_cells = len(self.names) * num_groups
+        self._count = np.zeros(num_cells)
+        self._mean = np.zeros(num_cells)
+        self._m2 = np.zeros(num_cells)
+        self._min = np.full(num_cells, np.inf)
+        self._max = np.full(num_cells, -np.inf)
+        # t-digest centroids of all cells, sorted by cell and then by mean
+        self._cell = np.empty(0, dtype=np.intp)
+        self._centroid_mean = np.empty(0)
+        self._centroid_weight = np.empty(0)
+
+    @property
+    def shape(self):
+        return len(self.names), self.num_groups
+
+    def update(self, values, group=None, weights=None):
+        """
+        Fold a batch of observations into the summary.
+
+        :param values: Array of shape (num_columns, size); a 1-D array is
+                       accepted for a single column.
+        :param group: Group index of every observation (optional, defaults to 0).
+        :param weights: Weight (multiplicity) of every observation (optional);
+                        observations with weight <= 0 are ignored.
+        :return: self
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(len(self.names), -1)
+        size = values.shape[1]
+        if not size:
+            return self
+        group = np.zeros(size, dtype=np.intp) if group is None else np.asarray(group, dtype=np.intp)
+        weights = np.ones(size) if weights is None else np.asarray(weights, dtype=np.float64)
+        # Observations without weight carry no data and must not reach min, max or the digest
+        observed = weights > 0
+        if not observed.all():
+            values, group, weights = values[:, observed], group[observed], weights[observed]
+            if not len(weights):
+                return self
+        cell = (np.arange(len(self.names))[:, None] * self.num_groups + group).reshape(-1)
+        values = values.reshape(-1)
+        weights = np.tile(weights, len(self.names))
+        num_cells = len(self._count)
+
+        # Batch moments per cell, then Chan's update of the running moments
+        count = np.bincount(cell, weights=weights, minlength=num_cells)
+        occupied = count > 0
+        mean = np.divide(np.bincount(cell, weights=weights * values, minlength=num_cells), count,
+                         out=np.zeros(num_cells), where=occupied)
+        deviation = values - mean[cell]
+        m2 = np.bincount(cell, weights=weights * deviation * deviation, minlength=num_cells)
+        self._combine(count, mean, m2)
+
+        order = np.lexsort((values, cell))
+        sorted_cell = cell[order]
+        start = np.flatnonzero(np.r_[True, sorted_cell[1:] != sorted_cell[:-1]])
+        sorted_values = values[order]
+        present = sorted_cell[start]
+        self._min[present] = np.minimum(self._min[present], sorted_values[start])
+        self._max[present] = np.maximum(self._max[present], sorted_values[np.r_[start[1:], len(order)] - 1])
+
+        if self.compression is not None:
+            self._digest(sorted_cell, sorted_values, weights[order])
+        return self
+
+    def merge(self, other):
+        """
+        Fold another summary of the same shape into this one.
+
+        :return: self
+        """
+        if other.names != self.names or other.num_groups != self.num_groups or other.compression != self.compression:
+            raise ValueError("Only statistics with the same columns, groups and compression can be merged.")
+        self._combine(other._count, other._mean, other._m2)
+        self._min = np.minimum(self._min, other._min)
+        self._max = np.maximum(self._max, other._max)
+        if self.compression is not None:
+            self._digest(other._cell, other._centroid_mean, other._centroid_weight)
+        return self
+
+    @classmethod
+    def merged(cls, summaries):
+        """
+        Merge several summaries of the same shape into a new one.
+        """
+        summaries = list(summaries)
+        first = summaries[0]
+        result = cls(first.names, first.num_groups, first.compression)
+        for summary in summaries:
+            result.merge(summary)
+        return result
+
+    @property
+    def count(self):
+        """
+        Total weight per group.
+        """
+        return self._count.reshape(self.shape)[0].copy()
+
+    @property
+    def mean(self):
+        """
+        Mean per (column, group) cell (0 for empty groups).
+        """
+        return self._mean.reshape(self.shape).copy()
+
+    @property
+    def variance(self):
+        """
+        Population variance per (column, group) cell (0 for empty groups).
+        """
+        return np.divide(self._m2, self._count, out=np.zeros_like(self._m2), where=self._count > 0).reshape(self.shape)
+
+    @property
+    def min(self):
+        """
+        Minimum per (column, group) cell (nan for empty groups).
+        """
+        return np.where(self._count > 0, self._min, np.nan).reshape(self.shape)
+
+    @property
+    def max(self):
+        """
+        Maximum per (column, group) cell (nan for empty groups).
+        """
+        return np.where(self._count > 0, self._max, np.nan).reshape(self.shape)
+
+    def quantile(self, q):
+        """
+        Approximate quantiles per (column, group) cell.
+
+        Interpolates linearly between the centroids of each cell's t-digest,
+        anchored at the exact minimum and maximum.
+
+        :param q: Quantile level or array of levels in [0, 1].
+        :return: Array of shape q.shape + (num_columns, num_groups); nan for empty groups.
+        """
+        if self.compression is None:
+            raise ValueError("Quantiles were not tracked (compression is None).")
+        q = np.asarray(q, dtype=np.float64)
+        num_cells = len(self._count)
+        result = np.full(q.shape + (num_cells,), np.nan)
+        present = np.flatnonzero(self._count > 0)
+        if not len(present):
+            return result.reshape(q.shape + self.shape)
+
+        # Cell c spans keys 2c (its minimum) to 2c + 1 (its maximum), with every
+        # centroid at 2c plus its mid-rank as a fraction of the cell's weight
+        cumulative = np.cumsum(self._centroid_weight)
+        start = np.searchsorted(self._cell, np.arange(num_cells))
+        before = np.r_[0.0, cumulative][start]
+        rank = (cumulative - self._centroid_weight / 2 - before[self._cell]) / self._count[self._cell]
+        keys = np.concatenate((2.0 * present, 2.0 * self._cell + rank, 2.0 * present + 1))
+        points = np.concatenate((self._min[present], self._centroid_mean, self._max[present]))
+        order = np.argsort(keys, kind='stable')
+        keys, points = keys[order], points[order]
+
+        target = 2.0 * present + q[..., None]
+        right = np.minimum(np.searchsorted(keys, target, side='left'), len(keys) - 1)
+        left = np.maximum(right - 1, 0)
+        span = keys[right] - keys[left]
+        fraction = np.divide(target - keys[left], span, out=np.ones_like(target), where=span > 0)
+        result[..., present] = points[left] + fraction * (points[right] - points[left])
+        return result.reshape(q.shape + self.shape)
+
+    def _combine(self, count, mean, m2):
+        total = self._count + count
+        occupied = total > 0
+        delta = mean - self._mean
+        share = np.divide(count, total, out=np.zeros_like(total), where=occupied)
+        self._mean = self._mean + delta * share
+        self._m2 = self._m2 + m2 + delta * delta * self._count * share
+        self._count = total
+
+    def _digest(self, cell, means, weights):
+        cell = np.concatenate((self._cell, cell))
+        means = np.concatenate((self._centroid_mean, means))
+        weights = np.concatenate((self._centroid_weight, weights))
+        order = np.lexsort((means, cell))
+        cell, means, weights = cell[order], means[order], weights[order]
+
+        # Mid-rank of every point within its cell, mapped through the t-digest
+        # scale function; points sharing a cell and a scale bucket merge
+        cumulative = np.cumsum(weights)
+        boundary = np.r_[True, cell[1:] != cell[:-1]]
+        start = np.flatnonzero(boundary)
+        sizes = np.diff(np.r_[start, len(cell)])
+        before = np.repeat(cumulative[start] - weights[start], sizes)
+        total = np.repeat(np.add.reduceat(weights, start), sizes)
+        rank = (cumulative - before - weights / 2) / total
+        bucket = np.floor(self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * rank - 1, -1, 1)))
+
+        new = boundary | np.r_[True, bucket[1:] != bucket[:-1]]
+        centroid = np.cumsum(new) - 1
+        merged_weight = np.bincount(centroid, weights=weights)
+        self._cell = cell[new]
+        self._centroid_mean = np.bincount(centroid, weights=weights * means) / merged_weight
+        self._centroid_weight = merged_weight
+
+
+def population_statistics(population, num_patches, compression=COMPRESSION):
+    """
+    Summarize fitness and traits of a population per patch in one pass.
+
+    Works for every population layout; classes of a GenotypeCounts are
+    weighted by their counts.
+
+    :param population: Population, AllelePopulation or GenotypeCounts.
+    :param num_patches: Number of patches (groups).
+    :param compression: t-digest compression, or None to skip quantiles.
+    :return: A StreamingStatistics with the columns ('fitness',) + trait names.
+    """
+    statistics = StreamingStatistics(('fitness',) + population.trait_names, num_patches, compression)
+    values = np.vstack((population.fitness[None, :], population.traits))
+    return statistics.update(values, population.patch, getattr(population, 'count', None))
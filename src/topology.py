@@ -0,0 +1,157 @@
+import numpy as np
+from rng import get_rng
+
+
+class CaveNetwork:
+    def __init__(self, indptr, indices, probability):
+        """
+        Cave system as a sparse directed graph of patches (chambers).
+
+        Edges are stored in CSR form: the edges leaving patch ``p`` are
+        ``indices[indptr[p]:indptr[p + 1]]`` with dispersal probabilities
+        ``probability[indptr[p]:indptr[p + 1]]``. Per generation an organism
+        in ``p`` moves along one of these edges with the given probability and
+        stays in ``p`` with the remaining probability.
+
+        :param indptr: Row pointer array of length num_patches + 1.
+        :param indices: Destination patch of every edge.
+        :param probability: Dispersal probability of every edge.
+        """
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.probability = np.asarray(probability, dtype=np.float64)
+        if len(self.indices) != len(self.probability) or self.indptr[-1] != len(self.indices):
+            raise ValueError("CSR arrays of the cave network are inconsistent.")
+        if np.any(self.probability < 0):
+            raise ValueError("Dispersal probabilities must be non-negative.")
+
+        self.source = np.repeat(np.arange(self.num_patches), np.diff(self.indptr))
+        cumulative = np.cumsum(self.probability)
+        row_start = np.concatenate(([0.0], cumulative))[self.indptr]
+        within_row = cumulative - row_start[:-1][self.source]
+        self.leave_probability = np.diff(row_start)
+        if np.any(self.leave_probability > 1 + 1e-9):
+            raise ValueError("Dispersal probabilities out of a patch must sum to at most 1.")
+        # Row id plus cumulative probability within the row; increasing over
+        # all edges, so one searchsorted finds the edge for every organism
+        self._keys = self.source + within_row
+
+    @property
+    def num_patches(self):
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_edges(cls, num_patches, sources, targets, probability):
+        """
+        Build a network from edge lists.
+
+        :param num_patches: Number of patches.
+        :param sources: Origin patch of every edge.
+        :param targets: Destination patch of every edge.
+        :param probability: Dispersal probability of every edge (scalar or array).
+        """
+        sources = np.asarray(sources, dtype=np.intp)
+        targets = np.asarray(targets, dtype=np.intp)
+        probability = np.broadcast_to(np.asarray(probability, dtype=np.float64), sources.shape)
+        order = np.argsort(sources, kind='stable')
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=num_patches))))
+        return cls(indptr, targets[order], probability[order])
+
+    @classmethod
+    def from_adjacency(cls, num_patches, sources, targets, dispersal_rate):
+        """
+        Build a network where organisms leave their patch with probability
+        ``dispersal_rate`` and pick one of its neighbours uniformly.
+        """
+        sources = np.asarray(sources, dtype=np.intp)
+        degree = np.bincount(sources, minlength=num_patches)
+        return cls.from_edges(num_patches, sources, targets, dispersal_rate / degree[sources])
+
+    @classmethod
+    def build(cls, topology, num_patches, dispersal_rate):
+        """
+        Build one of the standard cave topologies.
+
+        :param topology: 'chain', 'ring', 'grid' or 'complete'.
+        :param num_patches: Number of patches.
+        :param dispersal_rate: Probability that an organism leaves its patch per generation.
+        """
+        patches = np.arange(num_patches)
+        if topology in ('chain', 'ring'):
+            left, right = patches[:-1], patches[1:]
+            if topology == 'ring' and num_patches > 2:
+                left, right = patches, np.roll(patches, -1)
+            sources, targets = np.concatenate((left, right)), np.concatenate((right, left))
+        elif topology == 'grid':
+            width = int(np.ceil(np.sqrt(num_patches)))
+            horizontal = patches[(patches % width != width - 1) & (patches + 1 < num_patches)]
+            vertical = patches[patches + width < num_patches]
+            left = np.concatenate((horizontal, vertical))
+            right = np.concatenate((horizontal + 1, vertical + width))
+            sources, targets = np.concatenate((left, right)), np.concatenate((right, left))
+        elif topology == 'complete':
+            sources, targets = np.divmod(np.arange(num_patches * num_patches), num_patches)
+            distinct = sources != targets
+            sources, targets = sources[distinct], targets[distinct]
+        else:
+            raise ValueError(f"Unknown cave topology: {topology}")
+        return cls.from_adjacency(num_patches, sources, targets, dispersal_rate)
+
+    def tile(self, copies):
+        """
+        Return a network made of ``copies`` disconnected copies of this one.
+
+        Copy ``c`` occupies patches ``c * num_patches`` to ``(c + 1) * num_patches - 1``,
+        which is the patch layout of the batched replicate engine.
+        """
+        shift = np.repeat(np.arange(copies) * self.num_patches, len(self.indices))
+        indptr = np.concatenate((
+            [0], (self.indptr[1:] + len(self.indices) * np.arange(copies)[:, None]).reshape(-1)
+        ))
+        return CaveNetwork(indptr, np.tile(self.indices, copies) + shift, np.tile(self.probability, copies))
+
+    def migrate(self, patch, rng=None):
+        """
+        Move every organism one dispersal step through the network.
+
+        :param patch: Current patch of each organism.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: New patch of each organism.
+        """
+        patch = np.asarray(patch, dtype=np.intp)
+        u = get_rng(rng).random(len(patch))
+        if not len(self.indices):
+            return patch.copy()
+        edge = np.searchsorted(self._keys, patch + u, side='right')
+        moves = edge < self.indptr[patch + 1]
+        return np.where(moves, self.indices[np.minimum(edge, len(self.indices) - 1)], patch)
+
+    def split_counts(self, patch, count, rng=None):
+        """
+        Move groups of organisms one dispersal step through the network.
+
+        Group ``k`` holds ``count[k]`` organisms in ``patch[k]``; it is split
+        over staying and the edges out of its patch with one multinomial draw.
+
+        :param patch: Current patch of each group.
+        :param count: Number of organisms in each group.
+        :param rng: numpy.random.Generator to draw from (optional).
+        :return: Tuple (group, patch, count) with the group every non-empty
+                 piece comes from, its new patch and its size.
+        """
+        patch = np.asarray(patch, dtype=np.intp)
+        count = np.asarray(count, dtype=np.int64)
+        degree = np.diff(self.indptr)[patch]
+        width = int(degree.max(initial=0)) + 1
+        # Column 0 is staying put, columns 1.. the edges of the group's patch
+        probability = np.zeros((len(patch), width))
+        destination = np.repeat(patch[:, None], width, axis=1)
+        probability[:, 0] = np.maximum(1 - self.leave_probability[patch], 0)
+        has_edge = np.arange(width - 1) < degree[:, None]
+        edge = (self.indptr[patch][:, None] + np.arange(width - 1))[has_edge]
+        probability[:, 1:][has_edge] = self.probability[edge]
+        destination[:, 1:][has_edge] = self.indices[edge]
+
+        split = get_rng(rng).multinomial(count, probability)
+        group, column = np.nonzero(split)
+        return group, destination[group, column], split[group, column]
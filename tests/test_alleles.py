@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from alleles import AllelePopulation
+from population import Population
+from progress import QUIET, ProgressLogger
+from simulation import simulate
+
+
+@pytest.mark.parametrize('size', [1, 7, 1000, 100001])
+def test_trait_means_match_dense_population(size):
+    rng = np.random.default_rng(size)
+    population = Population(rng.choice(rng.random(40), size=(3, size)))
+    assert AllelePopulation.from_population(population).trait_means() == population.trait_means()
+
+
+@pytest.mark.parametrize('params', [dict(), dict(num_patches=4, topology='ring'), dict(engine='hybrid', num_patches=3)])
+def test_dense_and_allele_runs_record_identical_histories(params):
+    histories = [
+        simulate(3, 2000, 'default_cave', seed=5, genetics=genetics, logger=ProgressLogger(level=QUIET), **params)
+        for genetics in ('dense', 'alleles')
+    ]
+    for dense, alleles in zip(*(history.as_arrays() for history in histories)):
+        np.testing.assert_array_equal(dense, alleles)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from metrics import Metric, MetricRegistry
+from progress import QUIET, ProgressLogger
+from simulation import resume_simulation, simulate
+
+RUN = dict(num_decades=3, initial_population_size=400, preset_name='default_cave', num_patches=3, seed=11)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _interrupt():
+    raise Interrupted
+
+
+@pytest.mark.parametrize('engine, genetics', [('individual', 'dense'), ('individual', 'alleles'), ('aggregate', 'dense')])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, engine, genetics):
+    quiet = ProgressLogger(level=QUIET)
+    expected = simulate(**RUN, engine=engine, genetics=genetics, logger=quiet)
+    assert len(expected) == RUN['num_decades'] * 10
+
+    path = str(tmp_path / 'run.npz')
+    metrics = MetricRegistry()
+    metrics.add(Metric('interrupt', _interrupt, every=13))
+    with pytest.raises(Interrupted):
+        simulate(**RUN, engine=engine, genetics=genetics, logger=quiet,
+                 checkpoint_path=path, checkpoint_every=5, metrics=metrics)
+    resumed = resume_simulation(path, logger=quiet)
+
+    assert len(resumed) == len(expected)
+    for actual, wanted in zip(resumed.as_arrays(), expected.as_arrays()):
+        np.testing.assert_array_equal(actual, wanted)
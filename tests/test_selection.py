@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from selection import AliasTable
+
+
+def _implied_probability(table):
+    """Probability of drawing every index from its own segment."""
+    size = np.diff(table.offsets)
+    segment = np.repeat(np.arange(len(size)), size)
+    mass = table.probability + np.bincount(table.alias, weights=1 - table.probability, minlength=len(table.alias))
+    return mass / size[segment]
+
+
+def _expected_probability(weights, offsets):
+    size = np.diff(offsets)
+    segment = np.repeat(np.arange(len(size)), size)
+    total = np.bincount(segment, weights=weights, minlength=len(size))[segment]
+    return np.where(total > 0, weights / np.where(total > 0, total, 1), 1 / size[segment])
+
+
+@pytest.mark.parametrize('size', [1, 2, 10, 1000, 200000])
+def test_alias_table_reproduces_weights(size):
+    rng = np.random.default_rng(size)
+    weights = rng.random(size) ** 4
+    offsets = np.array([0, size])
+    np.testing.assert_allclose(_implied_probability(AliasTable(weights)), _expected_probability(weights, offsets),
+                               rtol=1e-12, atol=1e-15)
+
+
+def test_alias_table_reproduces_segmented_weights():
+    rng = np.random.default_rng(3)
+    weights = rng.exponential(size=5000) * (rng.random(5000) < 0.7)
+    weights[1200:1300] = 0  # a segment without weight is sampled uniformly
+    weights[4000] = 1e6  # a heavy outlier needs many pairing rounds
+    offsets = np.array([0, 1, 1200, 1300, 3999, 5000])
+    table = AliasTable(weights, offsets=offsets)
+    np.testing.assert_allclose(_implied_probability(table), _expected_probability(weights, offsets),
+                               rtol=1e-12, atol=1e-15)
+    # Aliases never leave their segment
+    segment = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    np.testing.assert_array_equal(segment[table.alias], segment)
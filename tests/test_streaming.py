@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from streaming import StreamingStatistics
+
+NAMES = ('fitness', 'size')
+
+
+def _batch(rng, size, num_groups):
+    values = np.vstack((rng.normal(0.5, 0.2, size), rng.exponential(3.0, size)))
+    return values, rng.integers(num_groups, size=size), rng.integers(0, 4, size).astype(np.float64)
+
+
+@pytest.mark.parametrize('compression', [None, 200])
+def test_merge_matches_single_pass_update(compression):
+    rng = np.random.default_rng(7)
+    batches = [_batch(rng, size, 5) for size in (1, 300, 4000, 25000)]
+    values, group, weights = (np.concatenate(parts, axis=-1) for parts in zip(*batches))
+    single = StreamingStatistics(NAMES, 5, compression).update(values, group, weights)
+    merged = StreamingStatistics.merged(StreamingStatistics(NAMES, 5, compression).update(*batch) for batch in batches)
+
+    np.testing.assert_array_equal(merged.count, single.count)
+    np.testing.assert_allclose(merged.mean, single.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.variance, single.variance, rtol=1e-10)
+    np.testing.assert_array_equal(merged.min, single.min)
+    np.testing.assert_array_equal(merged.max, single.max)
+    if compression is not None:
+        # The digests are approximate: both must stay close to the exact quantiles
+        q = np.array([0.01, 0.1, 0.5, 0.9, 0.99])
+        exact = np.stack([
+            np.stack([_weighted_quantile(values[column, group == g], weights[group == g], q) for g in range(5)], axis=-1)
+            for column in range(len(NAMES))
+        ], axis=1)
+        tolerance = 0.02 * (single.max - single.min)
+        assert np.all(np.abs(single.quantile(q) - exact) < tolerance)
+        assert np.all(np.abs(merged.quantile(q) - exact) < tolerance)
+
+
+def test_merge_keeps_empty_groups_empty():
+    rng = np.random.default_rng(3)
+    values, _, _ = _batch(rng, 100, 1)
+    statistics = StreamingStatistics.merged([
+        StreamingStatistics(NAMES, 3).update(values, np.zeros(100, dtype=np.intp)),
+        StreamingStatistics(NAMES, 3).update(values, np.full(100, 2)),
+    ])
+    np.testing.assert_array_equal(statistics.count, [100, 0, 100])
+    assert np.isnan(statistics.min[:, 1]).all() and np.isnan(statistics.quantile(0.5)[:, 1]).all()
+
+
+def _weighted_quantile(values, weights, q):
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    rank = (np.cumsum(weights) - weights / 2) / weights.sum()
+    return np.interp(q, rank[weights > 0], values[weights > 0])